@@ -0,0 +1,785 @@
+"""Cœur analytique de l'étude, sans dépendance à Streamlit.
+
+Chargement du classeur, index des réponses, cube d'agrégation et rapport
+précalculé. Utilisable en ligne de commande :
+
+    python analytics.py Data_challenge.xlsx --questions questions.json -o rapport.json
+
+Avec -j N, le cube et les segments du rapport sont calculés par N processus.
+"""
+import argparse
+import copy
+import functools
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# ---------------------------- QUESTIONNAIRE ----------------------------
+# "multiple" : réponses à choix multiples, stockées sous la forme « A / B / C »
+questions = {
+    # -------------------------------
+    # A. Profil du Répondant
+    # -------------------------------
+    "Q1 - Filière d'études": {
+        "colonne": "Filière",
+        "description": "Quelle est ta filière d’études ?",
+        "options": ["Ingénierie", "Logistique - Supply Chain", "Commerce - Management", "Autre"]
+    },
+    "Q2 - Niveau d'études": {
+        "colonne": "Niveau d'études",
+        "description": "Quel est ton niveau d’études actuel ?",
+        "options": ["Bac +3", "Bac +4", "Bac +5 et plus"]
+    },
+    "Q3 - Recherche emploi": {
+        "colonne": "Recherche d'emploi",
+        "description": "As-tu déjà recherché un stage ou un emploi dans l’industrie ou la Supply Chain ?",
+        "options": ["Oui, et j'ai postulé", "Oui, mais non postulé", "Non intéressé"]
+    },
+
+    # -------------------------------
+    # B. Perception des Métiers
+    # -------------------------------
+    "Q4 - Connaissance métiers": {
+        "colonne": "Niveau de connaissance",
+        "description": "Quel est ton niveau de connaissance sur ces métiers ?",
+        "options": ["Très bon", "Moyen", "Faible", "Aucun"]
+    },
+    "Q5 - Adjectifs associés": {
+        "colonne": "Perception des métiers",
+        "description": "Quels adjectifs associes-tu spontanément à ces métiers ? (3 choix max)",
+        "multiple": True,
+        "options": ["Innovant", "Routinier", "Technique", "Physiquement exigeant", 
+                   "Peu valorisé", "Dynamique", "Mal payé", "Opportunités d'évolution", "Autre"]
+    },
+    "Q6 - Opportunités carrière": {
+        "colonne": "Opportunités de carrière",
+        "description": "Penses-tu que ces métiers offrent des opportunités intéressantes ?",
+        "options": ["Oui", "Peut-être", "Non"]
+    },
+    "Q7 - Freins candidature": {
+        "colonne": "Raisons de ne pas postuler",
+        "description": "Raisons de ne pas postuler ? (3 choix max)",
+        "multiple": True,
+        "options": ["Manque d'info", "Manque d'intérêt", "Salaire", "Image peu prestigieuse",
+                   "Travail répétitif", "Visibilité limitée", "Secteur moins innovant", "Autre"]
+    },
+
+    # -------------------------------
+    # C. Métiers dans le Luxe
+    # -------------------------------
+    "Q8 - Recrutement luxe": {
+        "colonne": "Recrutement dans le luxe",
+        "description": "Penses-tu que le luxe recrute dans ces domaines ?",
+        "options": ["Oui avec opportunités", "Oui sans détails", "Non"]
+    },
+    "Q9 - Perception luxe": {
+        "colonne": "Intérêt pour le luxe",
+        "description": "Travailler dans le luxe est...",
+        "options": ["Plus valorisant", "Aussi intéressant", "Moins intéressant"]
+    },
+    "Q10 - A priori négatifs": {
+        "colonne": "A priori négatifs",
+        "description": "As-tu des a priori négatifs sur ces métiers dans le luxe ?",
+        "options": ["Moins bien considérés", "Moins innovants", "Aussi intéressants", "Lien artisanat"]
+    },
+
+    # -------------------------------
+    # D. Attentes et Canaux
+    # -------------------------------
+    "Q11 - Motivations": {
+        "colonne": "Motivations",
+        "description": "Qu'est-ce qui te motiverait ? (3 choix max)",
+        "multiple": True,
+        "options": ["Salaire", "Évolution", "Rôle industrie", "Communication moderne", 
+                   "Collaborations écoles", "Rien"]
+    },
+    "Q12 - Canaux information": {
+        "colonne": "Canaux d'information",
+        "description": "Quels canaux t'influencent ? (3 choix max)",
+        "multiple": True,
+        "options": ["Réseaux sociaux", "Salons", "Témoignages", "Visites entreprises", 
+                   "Contenus en ligne", "Autre"]
+    },
+    "Q13 - Initiatives motivantes": {
+        "colonne": "Initiatives motivantes",
+        "description": "Initiatives pour découvrir les métiers ? (3 choix max)",
+        "multiple": True,
+        "options": ["Témoignages", "Expérience immersive", "Hackathons", "Ateliers/conférences", 
+                   "Campagnes réseaux", "Autre"]
+    }
+}
+
+# Tables croisées de l'analyse thématique : (colonne en ligne, colonne en colonne, titre)
+themes = {
+    "Perception des Métiers": [
+        ('Filière', 'Niveau de connaissance', 'Connaissance par filière'),
+        ("Niveau d'études", 'Perception des métiers', 'Perception par niveau'),
+    ],
+    "Attractivité": [
+        ('Filière', 'Intérêt pour le luxe', 'Intérêt par filière'),
+        ("Niveau d'études", 'Opportunités de carrière', 'Opportunités par niveau'),
+    ],
+    "Freins": [
+        ('Filière', 'Raisons de ne pas postuler', 'Freins principaux'),
+        ("Niveau d'études", 'A priori négatifs', 'A priori par niveau'),
+    ],
+    "Leviers": [
+        ('Filière', 'Motivations', 'Motivations par filière'),
+        ("Niveau d'études", 'Initiatives motivantes', 'Initiatives par niveau'),
+    ],
+}
+
+# ---------------------------- CHARGEMENT DES DONNÉES ----------------------------
+# Source des réponses, remplaçable (export CSV multi-campus par exemple) par variable d'environnement
+DATA_PATH = os.environ.get('DATACHALLENGE_DATA', 'Data_challenge.xlsx')
+
+def file_digest(path):
+    """Empreinte SHA-256 du contenu d'un fichier, lue par blocs"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _write_atomic(path, write):
+    """Écrit via un fichier temporaire puis le renomme, pour ne jamais exposer un fichier à moitié écrit"""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+def _write_meta(meta_path, meta):
+    try:
+        _write_atomic(meta_path, lambda tmp: tmp.write_text(json.dumps(meta), encoding='utf-8'))
+    except OSError:
+        pass
+
+# Version du format du cache : un cache d'un format antérieur est réécrit
+CACHE_FORMAT = 2
+
+def compact_survey(df, questions=questions):
+    """Colonnes des questions converties en catégories : un code entier par ligne, chaque libellé stocké une fois
+
+    Les réponses à choix unique ont pour catégories les options du
+    questionnaire (puis les libellés inattendus) ; les combinaisons « A / B »
+    des choix multiples gardent leur chaîne d'origine, leurs bitmaps sont
+    dans BitmapIndex.
+    """
+    columns = {}
+    for q in questions.values():
+        col = q['colonne']
+        if col not in df or isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        seen = list(df[col].dropna().unique())
+        categories = seen if q.get('multiple') else ordered_labels(q, seen)
+        columns[col] = pd.Categorical(df[col], categories=categories)
+    return df.assign(**columns) if columns else df
+
+def memory_footprint(df, index=None):
+    """Mémoire (octets) de chaque colonne : en chaînes Python, en catégories, et dans l'index des répondants"""
+    rows = []
+    for col in df.columns:
+        series = df[col]
+        index_bytes = 0
+        if index is not None and col in index.bitmaps:
+            index_bytes = index.bitmaps[col].nbytes + (index.codes[col].nbytes if col in index.codes else 0)
+        rows.append({
+            'Colonne': col,
+            'Chaînes': int(series.astype(object).memory_usage(deep=True, index=False)),
+            'Compact': int(series.memory_usage(deep=True, index=False)),
+            'Index': index_bytes,
+        })
+    return pd.DataFrame(rows, columns=['Colonne', 'Chaînes', 'Compact', 'Index']).set_index('Colonne')
+
+def _sync_cache(source, force=False):
+    """Met à jour le cache Arrow IPC du classeur ; renvoie (chemin du cache ou None, DataFrame s'il a fallu re-parser)"""
+    cache = source.with_suffix('.arrow')
+    meta_path = source.with_suffix('.arrow.json')
+    stat = source.stat()
+    try:
+        meta = json.loads(meta_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        meta = {}
+
+    digest = None
+    if cache.exists() and meta.get('format') == CACHE_FORMAT and not force:
+        fresh = meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('size') == stat.st_size
+        if not fresh:
+            # mtime modifié : on ne re-parse que si le contenu a réellement changé
+            digest = file_digest(source)
+            fresh = meta.get('sha256') == digest
+        if fresh:
+            if meta.get('mtime_ns') != stat.st_mtime_ns:
+                meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                _write_meta(meta_path, meta)
+            return cache, None
+
+    df = compact_survey(pd.read_excel(source))
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # Non compressé pour pouvoir être mappé en mémoire sans décodage
+        _write_atomic(cache, lambda tmp: feather.write_feather(table, tmp, compression='uncompressed'))
+        _write_meta(meta_path, {
+            'format': CACHE_FORMAT,
+            'sha256': digest or file_digest(source),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+        })
+    except (OSError, pa.ArrowException):
+        # Répertoire en lecture seule ou types non convertibles : on sert les données sans cache
+        return None, df
+    return cache, df
+
+def survey_cache(path=DATA_PATH):
+    """Chemin du cache Arrow à jour du classeur (créé si besoin), ou None s'il n'a pas pu être écrit"""
+    return _sync_cache(Path(path))[0]
+
+def read_survey(path=DATA_PATH):
+    """Lit le classeur via un cache Arrow IPC stocké à côté, re-parsé seulement si le fichier source change
+
+    Les colonnes des questions sont rendues en catégories (voir compact_survey).
+    """
+    source = Path(path)
+    cache, df = _sync_cache(source)
+    if df is None:
+        try:
+            return feather.read_table(cache, memory_map=True).to_pandas()
+        except (OSError, pa.ArrowException):
+            # Cache illisible : on re-parse le classeur et on le réécrit
+            cache, df = _sync_cache(source, force=True)
+    return df
+
+# ---------------------------- INDEX ET AGRÉGATS ----------------------------
+def split_answers(series):
+    """Normalise les réponses « A / B / C » en « A|B|C » pour pouvoir les découper
+
+    Seul un « / » entouré d'espaces sépare deux choix : une option comme
+    « Ateliers/conférences » reste entière.
+    """
+    return series.str.replace(r'\s+/\s+', '|', regex=True).str.strip()
+
+def ordered_labels(q_data, seen):
+    """Options du questionnaire d'abord, puis les libellés rencontrés dans l'export"""
+    order = [o for o in q_data['options'] if o in seen]
+    return order + [label for label in seen if label not in order]
+
+def build_choice_index(df, questions=questions):
+    """Matrice indicatrice (une colonne booléenne par option) de chaque question à choix multiples"""
+    index = {}
+    for q in questions.values():
+        col = q['colonne']
+        if not q.get('multiple') or col not in df:
+            continue
+        # Découpage des seules valeurs distinctes, puis une ligne de la matrice par répondant
+        codes, uniques = pd.factorize(df[col])
+        dummies = split_answers(pd.Series(uniques, dtype=object).astype(str)).str.get_dummies(sep='|')
+        dummies = dummies.drop(columns='', errors='ignore')
+        dummies = dummies[ordered_labels(q, list(dummies.columns))]
+        # Dernière ligne : valeur manquante (code -1), aucune réponse
+        values = np.vstack([dummies.to_numpy(dtype=bool), np.zeros((1, dummies.shape[1]), dtype=bool)])
+        index[col] = pd.DataFrame(values[codes], index=df.index, columns=dummies.columns)
+    return index
+
+class BitmapIndex:
+    """Codes catégoriels et bitmaps (un par réponse) de toutes les questions, pour filtrer sans copier le DataFrame
+
+    Les questions à choix multiples ne sont gardées que sous forme de bitmaps
+    (un bit par répondant et par réponse) ; leur matrice indicatrice est
+    décompressée à la demande.
+    """
+
+    def __init__(self, df, questions=questions):
+        self.n_rows = len(df)
+        self.labels = {}    # colonne -> réponses, dans l'ordre des bitmaps
+        self.codes = {}     # colonne -> code de la réponse par ligne (-1 si vide), questions à choix unique
+        self.bitmaps = {}   # colonne -> tableau (réponses x octets) de bits compressés
+        choice_index = build_choice_index(df, questions)
+        for q in questions.values():
+            col = q['colonne']
+            if col in choice_index:
+                self.labels[col] = list(choice_index[col].columns)
+                self.bitmaps[col] = np.packbits(choice_index[col].to_numpy().T, axis=1)
+            elif col in df:
+                cat = pd.Categorical(df[col], categories=ordered_labels(q, list(df[col].dropna().unique())))
+                self.labels[col] = list(cat.categories)
+                self.codes[col] = cat.codes
+                self.bitmaps[col] = np.packbits(self.indicator(col).T, axis=1)
+        self._all = np.packbits(np.ones(self.n_rows, dtype=bool))
+
+    @property
+    def nbytes(self):
+        """Mémoire occupée par les codes et les bitmaps"""
+        return sum(a.nbytes for a in self.codes.values()) + sum(a.nbytes for a in self.bitmaps.values())
+
+    def save(self, folder):
+        """Écrit l'index dans un dossier, un fichier .npy par tableau, relisible en mémoire partagée par load()"""
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        columns = list(self.labels)
+        for i, col in enumerate(columns):
+            np.save(folder / f'bitmaps-{i}.npy', self.bitmaps[col])
+            if col in self.codes:
+                np.save(folder / f'codes-{i}.npy', self.codes[col])
+        # Métadonnées écrites en dernier : leur présence signale un index complet
+        meta = {'n_rows': self.n_rows, 'columns': columns, 'labels': self.labels, 'codes': list(self.codes)}
+        _write_atomic(folder / 'index.json',
+                      lambda tmp: tmp.write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8'))
+
+    @classmethod
+    def load(cls, folder):
+        """Index écrit par save() ; ses tableaux sont mappés en lecture seule, les processus en partagent les pages"""
+        folder = Path(folder)
+        meta = json.loads((folder / 'index.json').read_text(encoding='utf-8'))
+        index = cls.__new__(cls)
+        index.n_rows = meta['n_rows']
+        index.labels = meta['labels']
+        index.codes, index.bitmaps = {}, {}
+        for i, col in enumerate(meta['columns']):
+            index.bitmaps[col] = np.load(folder / f'bitmaps-{i}.npy', mmap_mode='r')
+            if col in meta['codes']:
+                index.codes[col] = np.load(folder / f'codes-{i}.npy', mmap_mode='r')
+        index._all = np.packbits(np.ones(index.n_rows, dtype=bool))
+        return index
+
+    def indicator(self, col, start=0):
+        """Matrice indicatrice (répondants x réponses) d'une question, à partir de la ligne start"""
+        if col in self.codes:
+            return self.codes[col][start:, None] == np.arange(len(self.labels[col]))
+        first = start // 8
+        bits = np.unpackbits(self.bitmaps[col][:, first:], axis=1, count=self.n_rows - first * 8)
+        return bits[:, start - first * 8:].T.view(bool)
+
+    def append(self, df, questions=questions):
+        """Nouvel index couvrant aussi les lignes de df ; seul ce lot est découpé et encodé
+
+        Les réponses inédites du lot sont ajoutées en fin de vocabulaire, les
+        colonnes absentes de l'index d'origine sont ignorées.
+        """
+        new = copy.copy(self)
+        new.labels, new.codes, new.bitmaps = dict(self.labels), dict(self.codes), dict(self.bitmaps)
+        new.n_rows = self.n_rows + len(df)
+        batch_choice = build_choice_index(df, questions)
+        # Le dernier octet de l'ancien bitmap peut être incomplet : on le recompresse avec le lot
+        full_bytes = self.n_rows // 8
+        for q in questions.values():
+            col = q['colonne']
+            if col not in self.labels:
+                continue
+            labels = list(self.labels[col])
+            if col in self.codes:
+                values = df[col] if col in df else pd.Series(None, index=df.index, dtype=object)
+                labels += [label for label in values.dropna().unique() if label not in labels]
+                new.codes[col] = np.concatenate([self.codes[col], pd.Categorical(values, categories=labels).codes])
+                tail = new.codes[col][full_bytes * 8:, None] == np.arange(len(labels))
+            else:
+                seen = list(batch_choice[col].columns) if col in batch_choice else []
+                labels += [label for label in seen if label not in labels]
+                tail = np.zeros((new.n_rows - full_bytes * 8, len(labels)), dtype=bool)
+                tail[:self.n_rows - full_bytes * 8, :len(self.labels[col])] = self.indicator(col, full_bytes * 8)
+                if seen:
+                    tail[self.n_rows - full_bytes * 8:, [labels.index(label) for label in seen]] = \
+                        batch_choice[col].to_numpy()
+            new.labels[col] = labels
+            bitmaps = np.zeros((len(labels), full_bytes), dtype=np.uint8)
+            bitmaps[:len(self.labels[col])] = self.bitmaps[col][:, :full_bytes]
+            new.bitmaps[col] = np.concatenate([bitmaps, np.packbits(tail.T, axis=1)], axis=1)
+        new._all = np.packbits(np.ones(new.n_rows, dtype=bool))
+        return new
+
+    def select(self, col, answers):
+        """Bitmap des lignes ayant donné au moins une des réponses (OU)"""
+        bitmap = np.zeros_like(self._all)
+        for answer in answers:
+            if answer in self.labels[col]:
+                bitmap |= self.bitmaps[col][self.labels[col].index(answer)]
+        return bitmap
+
+    def query(self, criteria, how='and'):
+        """Combine les critères {colonne: réponses} par ET ou par OU ; sans critère, toutes les lignes"""
+        criteria = {col: answers for col, answers in criteria.items() if answers}
+        if not criteria:
+            return self._all.copy()
+        bitmaps = [self.select(col, answers) for col, answers in criteria.items()]
+        combine = np.bitwise_and if how == 'and' else np.bitwise_or
+        return combine.reduce(bitmaps)
+
+    def mask(self, bitmap):
+        """Masque booléen (une valeur par répondant) correspondant à un bitmap"""
+        return np.unpackbits(bitmap, count=self.n_rows).view(bool)
+
+    def counts(self, col, mask):
+        """Nombre de mentions de chaque réponse parmi les lignes du masque"""
+        if col in self.codes:
+            codes = self.codes[col][mask]
+            values = np.bincount(codes[codes >= 0], minlength=len(self.labels[col]))
+        else:
+            # Bits communs au masque et à chaque bitmap, comptés sans décompresser
+            values = np.bitwise_count(self.bitmaps[col] & np.packbits(mask)).sum(axis=1, dtype=np.int64)
+        return pd.Series(values, index=self.labels[col])
+
+def count_cells(cells, matrix, shape):
+    """Mentions de chaque réponse (colonnes de la matrice indicatrice) dans chaque case Filière × Niveau"""
+    n_cells = shape[0] * shape[1]
+    counts = np.zeros((n_cells, matrix.shape[1]), dtype=np.int64)
+    for j in range(matrix.shape[1]):
+        counts[:, j] = np.bincount(cells, weights=matrix[:, j], minlength=n_cells)
+    return counts.reshape(*shape, matrix.shape[1])
+
+def _grow_cube(array, shape):
+    """Agrandit un cube à de nouvelles réponses ; la case « non renseigné » des axes Filière / Niveau reste en dernier"""
+    grown = np.zeros(shape, dtype=array.dtype)
+    rows = list(range(array.shape[0] - 1)) + [shape[0] - 1]
+    cols = list(range(array.shape[1] - 1)) + [shape[1] - 1]
+    grown[np.ix_(rows, cols, *[range(n) for n in array.shape[2:]])] = array
+    return grown
+
+class AggregateCube:
+    """Cubes de comptage Filière × Niveau d'études × réponses, précalculés une fois pour chaque question
+
+    Chaque axe a une case supplémentaire, en dernier, pour les répondants sans
+    filière / niveau renseigné. Sans index des répondants (agrégats construits
+    en streaming), seuls les filtres Filière et Niveau d'études sont disponibles.
+    """
+
+    AXES = ('Filière', "Niveau d'études")
+
+    def __init__(self, labels, sizes, counts, index=None, maxsize=256):
+        self.labels = labels    # colonne -> réponses, dans l'ordre du dernier axe des cubes
+        self.sizes = sizes      # répondants par case Filière × Niveau
+        self.counts = counts    # colonne -> mentions par case et par réponse
+        self.index = index
+        self.shape = sizes.shape
+        self.maxsize = maxsize
+        self._memoize()
+
+    def _memoize(self):
+        # Mémoïsation bornée, indexée par l'état complet des filtres
+        self.cross_counts = functools.lru_cache(maxsize=self.maxsize)(self._cross_counts)
+        self.cross_tab = functools.lru_cache(maxsize=self.maxsize)(self._cross_tab)
+
+    def __getstate__(self):
+        # Les caches LRU ne se sérialisent pas : ils repartent vides dans le processus qui reçoit le cube
+        state = self.__dict__.copy()
+        del state['cross_counts'], state['cross_tab']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._memoize()
+
+    @classmethod
+    def from_index(cls, index, maxsize=256):
+        shape = tuple(len(index.labels[col]) + 1 for col in cls.AXES)
+        f, n = (np.where(index.codes[col] < 0, len(index.labels[col]), index.codes[col]) for col in cls.AXES)
+        cells = f.astype(np.int64) * shape[1] + n
+        sizes = np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape)
+        counts = {col: count_cells(cells, index.indicator(col), shape) for col in index.labels}
+        return cls(index.labels, sizes, counts, index, maxsize)
+
+    def extend(self, index, start):
+        """Nouveau cube pour un index agrandi par BitmapIndex.append : seules les lignes à partir de start sont comptées"""
+        shape = tuple(len(index.labels[col]) + 1 for col in self.AXES)
+        f, n = (np.where(index.codes[col][start:] < 0, len(index.labels[col]), index.codes[col][start:])
+                for col in self.AXES)
+        cells = f.astype(np.int64) * shape[1] + n
+        sizes = _grow_cube(self.sizes, shape)
+        sizes += np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape)
+        counts = {}
+        for col in index.labels:
+            k = len(index.labels[col])
+            counts[col] = _grow_cube(self.counts.get(col, np.zeros((*self.shape, 0), dtype=np.int64)), (*shape, k))
+            counts[col] += count_cells(cells, index.indicator(col, start), shape)
+        return AggregateCube(index.labels, sizes, counts, index, self.maxsize)
+
+    def _axis_selection(self, col, selected):
+        labels = self.labels[col]
+        if not selected:
+            return list(range(len(labels) + 1))
+        return [labels.index(value) for value in selected if value in labels]
+
+    def size(self, filiere=(), niveau=()):
+        """Nombre de répondants d'une sélection de filières et de niveaux"""
+        fsel = self._axis_selection('Filière', filiere)
+        nsel = self._axis_selection("Niveau d'études", niveau)
+        return int(self.sizes[np.ix_(fsel, nsel)].sum())
+
+    def distribution(self, col, filiere=(), niveau=()):
+        """Nombre de mentions de chaque réponse d'une question pour une sélection de filières et de niveaux"""
+        fsel = self._axis_selection('Filière', filiere)
+        nsel = self._axis_selection("Niveau d'études", niveau)
+        return pd.Series(self.counts[col][np.ix_(fsel, nsel)].sum(axis=(0, 1)), index=self.labels[col])
+
+    def _cross_counts(self, col_x, col_y, filiere=(), niveau=(), criteria=(), how='and'):
+        """Table croisée des mentions, sans lignes ni colonnes vides ; les réponses « A / B » comptent pour chacune de leurs options"""
+        labels_x = self.labels[col_x]
+        if not criteria and col_x in self.AXES:
+            # Simple découpe du cube, sans repasser sur les lignes
+            fsel = self._axis_selection('Filière', filiere)
+            nsel = self._axis_selection("Niveau d'études", niveau)
+            block = self.counts[col_y][np.ix_(fsel, nsel)]
+            table, rows = (block.sum(axis=1), fsel) if col_x == 'Filière' else (block.sum(axis=0), nsel)
+            keep = [i for i, row in enumerate(rows) if row < len(labels_x)]
+            table, labels_x = table[keep], [labels_x[rows[i]] for i in keep]
+        else:
+            if self.index is None:
+                raise ValueError("Filtres avancés indisponibles sans index des répondants")
+            bitmap = self.index.query({'Filière': filiere, "Niveau d'études": niveau})
+            if criteria:
+                bitmap &= self.index.query(dict(criteria), how)
+            mask = self.index.mask(bitmap)
+            x = self.index.indicator(col_x)[mask].astype(np.int64)
+            table = x.T @ self.index.indicator(col_y)[mask]
+        table = np.asarray(table, dtype=np.int64)
+        rows, cols = table.sum(axis=1) > 0, table.sum(axis=0) > 0
+        return pd.DataFrame(
+            table[rows][:, cols],
+            index=pd.Index([label for label, keep in zip(labels_x, rows) if keep], name=col_x),
+            columns=pd.Index([label for label, keep in zip(self.labels[col_y], cols) if keep], name=col_y)
+        )
+
+    def _cross_tab(self, col_x, col_y, filiere=(), niveau=(), criteria=(), how='and'):
+        """Table croisée en % par ligne"""
+        counts = self.cross_counts(col_x, col_y, filiere, niveau, criteria, how)
+        table = counts.to_numpy(dtype=float)
+        return pd.DataFrame(table / table.sum(axis=1, keepdims=True) * 100, index=counts.index, columns=counts.columns)
+
+    def cross_tab_interval(self, col_x, col_y, filiere=(), niveau=(), criteria=(), how='and', level=0.95):
+        """Bornes basse et haute (en %) de chaque case de cross_tab, par bootstrap ligne par ligne"""
+        counts = self.cross_counts(col_x, col_y, filiere, niveau, criteria, how)
+        low, high = bootstrap_interval(counts.to_numpy(), level=level)
+        return (pd.DataFrame(low, index=counts.index, columns=counts.columns),
+                pd.DataFrame(high, index=counts.index, columns=counts.columns))
+
+# ---------------------------- INTERVALLES DE CONFIANCE ----------------------------
+BOOTSTRAP_RESAMPLES = 2000
+
+def bootstrap_shares(counts, resamples=BOOTSTRAP_RESAMPLES, seed=0):
+    """Parts (en %) de chaque réponse dans chaque rééchantillonnage multinomial des comptes (premier axe)"""
+    counts = np.asarray(counts, dtype=np.int64)
+    if counts.shape[-1] == 0:
+        # Segment vide ou sans réponse : rien à tirer
+        return np.zeros((resamples, *counts.shape))
+    totals = counts.sum(axis=-1)
+    denominators = np.maximum(totals, 1)[..., None]
+    rng = np.random.default_rng(seed)
+    draws = rng.multinomial(totals, counts / denominators, size=(resamples, *totals.shape))
+    # Distribution sans aucune mention : pas de part, bornes vides
+    return np.where(totals[..., None] > 0, draws / denominators * 100, np.nan)
+
+def bootstrap_interval(counts, resamples=BOOTSTRAP_RESAMPLES, level=0.95, seed=0):
+    """Bornes basse et haute (en %) de la part de chaque réponse, par rééchantillonnage multinomial des comptes
+
+    counts : comptes d'une distribution, ou d'une table croisée (une distribution
+    par ligne). Tous les rééchantillonnages sont tirés en un seul appel ; la
+    graine fixe garde les mêmes bornes d'une exécution à l'autre.
+    """
+    alpha = (1 - level) / 2 * 100
+    low, high = np.percentile(bootstrap_shares(counts, resamples, seed), [alpha, 100 - alpha], axis=0)
+    return low, high
+
+def difference_interval(before, after, resamples=BOOTSTRAP_RESAMPLES, level=0.95):
+    """Bornes (en points) de l'écart de part de chaque réponse entre deux échantillons indépendants aux réponses alignées"""
+    alpha = (1 - level) / 2 * 100
+    diff = bootstrap_shares(after, resamples, seed=1) - bootstrap_shares(before, resamples, seed=0)
+    low, high = np.percentile(diff, [alpha, 100 - alpha], axis=0)
+    return low, high
+
+def percentage_interval(mentions, level=0.95):
+    """Intervalle de confiance (en %) de chaque réponse mentionnée, aligné sur percentages(mentions)"""
+    mentions = mentions[mentions > 0]
+    low, high = bootstrap_interval(mentions.to_numpy(), level=level)
+    return pd.DataFrame({'bas': low.round(1), 'haut': high.round(1)}, index=mentions.index)
+
+# ---------------------------- RAPPORT PRÉCALCULÉ ----------------------------
+def percentages(mentions):
+    """Part (en %) de chaque réponse mentionnée au moins une fois"""
+    mentions = mentions[mentions > 0]
+    return mentions.div(mentions.sum()).mul(100).round(1)
+
+def segment_key(filiere=(), niveau=()):
+    """Clé d'un segment du rapport, indépendante de l'ordre de sélection dans les filtres"""
+    return json.dumps([sorted(filiere), sorted(niveau)], ensure_ascii=False)
+
+def report_path(source):
+    return Path(source).with_suffix('.rapport.json')
+
+def filter_combinations(labels):
+    """Toutes les sélections possibles des filtres Filière × Niveau d'études (sélection vide = pas de filtre)"""
+    axes = []
+    for col in AggregateCube.AXES:
+        axes.append([c for r in range(len(labels[col]) + 1) for c in itertools.combinations(labels[col], r)])
+    return itertools.product(*axes)
+
+def build_segment(cube, filiere, niveau, crosstabs):
+    """Distributions et tables croisées d'une combinaison de filtres"""
+    return {
+        'n': cube.size(filiere, niveau),
+        'distributions': {
+            col: percentages(cube.distribution(col, filiere, niveau)).to_dict()
+            for col in cube.labels
+        },
+        'crosstabs': {
+            f'{x}|{y}': cube.cross_tab(x, y, filiere, niveau).round(4).to_dict(orient='split')
+            for x, y in crosstabs
+        },
+    }
+
+def build_report(cube, themes=themes, source=None, jobs=1):
+    """Calcule en une passe les distributions et tables croisées de chaque combinaison de filtres
+
+    Avec jobs > 1, les segments sont répartis entre autant de processus ;
+    chacun reçoit le cube une seule fois, à son démarrage.
+    """
+    crosstabs = [(x, y) for tables in themes.values() for x, y, _ in tables
+                 if x in cube.labels and y in cube.labels]
+    combinations = list(filter_combinations(cube.labels))
+    if jobs > 1:
+        segments = {}
+        # Quelques lots par processus pour équilibrer la charge
+        size = max(1, -(-len(combinations) // (jobs * 4)))
+        chunks = [combinations[i:i + size] for i in range(0, len(combinations), size)]
+        # Le cube part sans son index des répondants : les segments ne portent que sur Filière et Niveau
+        shared = AggregateCube(cube.labels, cube.sizes, cube.counts, maxsize=0)
+        with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(shared,)) as pool:
+            for part in pool.map(_build_segments, chunks, itertools.repeat(crosstabs)):
+                segments.update(part)
+    else:
+        segments = {
+            segment_key(filiere, niveau): build_segment(cube, filiere, niveau, crosstabs)
+            for filiere, niveau in combinations
+        }
+    return {'source': source or {}, 'segments': segments}
+
+def write_report(report, path):
+    _write_atomic(Path(path), lambda tmp: tmp.write_text(json.dumps(report, ensure_ascii=False), encoding='utf-8'))
+
+class Report:
+    """Rapport précalculé par la ligne de commande, servi tel quel par le tableau de bord"""
+
+    def __init__(self, data):
+        self.data = data
+
+    @classmethod
+    def load(cls, path, digest=None):
+        """Charge le rapport ; None s'il est absent ou calculé sur une autre version des données"""
+        try:
+            data = json.loads(Path(path).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if digest is not None and data.get('source', {}).get('sha256') != digest:
+            return None
+        return cls(data)
+
+    def _segment(self, filiere, niveau):
+        return self.data['segments'].get(segment_key(filiere, niveau), {})
+
+    def distribution(self, col, filiere=(), niveau=()):
+        """Pourcentages d'une question, ou None si le rapport ne la couvre pas"""
+        values = self._segment(filiere, niveau).get('distributions', {}).get(col)
+        return None if values is None else pd.Series(values, dtype=float)
+
+    def cross_tab(self, col_x, col_y, filiere=(), niveau=()):
+        """Table croisée en % par ligne, ou None si le rapport ne la couvre pas"""
+        table = self._segment(filiere, niveau).get('crosstabs', {}).get(f'{col_x}|{col_y}')
+        if table is None:
+            return None
+        return pd.DataFrame(table['data'], index=pd.Index(table['index'], name=col_x),
+                            columns=pd.Index(table['columns'], name=col_y), dtype=float)
+
+# ---------------------------- CALCUL PARALLÈLE ----------------------------
+# Cube reçu par chaque processus du pool à son démarrage
+_worker_cube = None
+
+def _init_worker(cube):
+    global _worker_cube
+    _worker_cube = cube
+
+def _build_segments(combinations, crosstabs):
+    return {
+        segment_key(filiere, niveau): build_segment(_worker_cube, filiere, niveau, crosstabs)
+        for filiere, niveau in combinations
+    }
+
+def _question_cube(cache, spec):
+    """Cube d'un sous-ensemble de questions, lu dans le cache Arrow mappé en mémoire"""
+    names = pa.ipc.open_file(pa.memory_map(cache)).schema.names
+    columns = [q['colonne'] for q in spec.values() if q['colonne'] in names]
+    # Seules les colonnes utiles sont lues, sans copie tant qu'elles ne sont pas converties
+    df = feather.read_table(cache, columns=columns, memory_map=True).to_pandas()
+    cube = AggregateCube.from_index(BitmapIndex(df, spec), maxsize=0)
+    return cube.labels, cube.sizes, cube.counts
+
+def parallel_cube(path=DATA_PATH, questions=questions, jobs=None, maxsize=256):
+    """Cube d'agrégation calculé question par question dans un pool de processus
+
+    Les processus ne reçoivent que le chemin du cache Arrow et leur question :
+    ils en mappent les colonnes en mémoire et partagent ainsi les pages du
+    fichier au lieu de recevoir chacun une copie du DataFrame. Le cube rendu
+    n'a pas d'index des répondants.
+    """
+    cache = survey_cache(path)
+    if cache is None:
+        # Pas de cache partageable : calcul dans le processus courant
+        index = BitmapIndex(read_survey(path), questions)
+        return AggregateCube.from_index(index, maxsize)
+    axes = {key: q for key, q in questions.items() if q['colonne'] in AggregateCube.AXES}
+    specs = [axes] + [{**axes, key: q} for key, q in questions.items() if key not in axes]
+    labels, counts = {}, {}
+    with ProcessPoolExecutor(jobs) as pool:
+        for part_labels, sizes, part_counts in pool.map(_question_cube, itertools.repeat(str(cache)), specs):
+            labels.update(part_labels)
+            counts.update(part_counts)
+    # Questions remises dans l'ordre du questionnaire
+    order = [q['colonne'] for q in questions.values() if q['colonne'] in labels]
+    return AggregateCube({col: labels[col] for col in order}, sizes, {col: counts[col] for col in order},
+                         maxsize=maxsize)
+
+# ---------------------------- LIGNE DE COMMANDE ----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Précalcule les distributions et tables croisées de toutes les combinaisons de filtres"
+    )
+    parser.add_argument('classeur', nargs='?', default=DATA_PATH, help="fichier Excel de l'enquête")
+    parser.add_argument('--questions', help="spécification JSON des questions (par défaut celle de analytics.py)")
+    parser.add_argument('-o', '--sortie', help="fichier du rapport (par défaut <classeur>.rapport.json)")
+    parser.add_argument('-j', '--processus', type=int, default=1,
+                        help="processus de calcul en parallèle (0 : un par cœur)")
+    parser.add_argument('--memoire', action='store_true',
+                        help="affiche la mémoire occupée par les données chargées, sans écrire de rapport")
+    args = parser.parse_args(argv)
+
+    spec = questions
+    if args.questions:
+        spec = json.loads(Path(args.questions).read_text(encoding='utf-8'))
+    if args.memoire:
+        df = read_survey(args.classeur)
+        footprint = memory_footprint(df, BitmapIndex(df, spec))
+        print((footprint / 1024).round(1).rename(columns=lambda c: f'{c} (Ko)').to_string())
+        total = footprint.sum()
+        print(f"Total : {total['Chaînes'] / 2**20:.2f} Mo en chaînes, "
+              f"{(total['Compact'] + total['Index']) / 2**20:.2f} Mo en catégories et bitmaps")
+        return
+    jobs = args.processus or os.cpu_count()
+    if jobs > 1:
+        cube = parallel_cube(args.classeur, spec, jobs, maxsize=0)
+    else:
+        cube = AggregateCube.from_index(BitmapIndex(read_survey(args.classeur), spec), maxsize=0)
+    report = build_report(cube, source={'path': str(args.classeur), 'sha256': file_digest(args.classeur)},
+                          jobs=jobs)
+
+    sortie = args.sortie or report_path(args.classeur)
+    write_report(report, sortie)
+    print(f"{len(report['segments'])} segments écrits dans {sortie}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Mesure des étapes critiques du tableau de bord à différentes tailles d'échantillon.
+
+Chaque exécution ajoute ses mesures (une ligne JSON par taille et par étape)
+au fichier de résultats, pour comparer les versions entre elles :
+
+    python benchmark.py --tailles 10000 1000000 10000000
+"""
+import argparse
+import json
+import platform
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import numpy as np
+import plotly.express as px
+import pyarrow.feather as feather
+
+from analytics import AggregateCube, BitmapIndex, questions, themes
+from synthetic import generate_survey, write_survey
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+# Au-delà, l'écriture du classeur de test prendrait plus de temps que le benchmark lui-même
+EXCEL_MAX_ROWS = 10_000
+
+def best_time(func, repeat):
+    """Meilleur temps (en secondes) sur `repeat` exécutions, et le résultat de la dernière"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def legacy_explode(df, col):
+    """Ancien chemin de l'explorateur : découpage des chaînes à chaque affichage"""
+    return df[col].str.split('/').explode().str.strip().value_counts()
+
+def run_size(n, workdir, repeat=3, excel_max=EXCEL_MAX_ROWS):
+    """Chronomètre chaque étape pour un échantillon synthétique de n répondants"""
+    timings = {}
+    df = generate_survey(n)
+
+    if n <= excel_max:
+        xlsx = workdir / f'synthetique_{n}.xlsx'
+        write_survey(df, xlsx)
+        timings['chargement_excel'], _ = best_time(lambda: pd.read_excel(xlsx), repeat)
+    arrow = workdir / f'synthetique_{n}.arrow'
+    write_survey(df, arrow)
+    timings['chargement_cache'], df = best_time(
+        lambda: feather.read_table(arrow, memory_map=True).to_pandas(), repeat
+    )
+
+    timings['index'], index = best_time(lambda: BitmapIndex(df), 1)
+    timings['cube'], cube = best_time(lambda: AggregateCube.from_index(index, maxsize=0), 1)
+
+    q3, q9 = questions['Q3 - Recherche emploi']['colonne'], questions['Q9 - Perception luxe']['colonne']
+    criteria = {q3: index.labels[q3][:1], q9: index.labels[q9][:1]}
+    timings['filtre'], mask = best_time(lambda: index.mask(index.query(criteria)), repeat)
+
+    col = questions['Q5 - Adjectifs associés']['colonne']
+    timings['explode_value_counts'], _ = best_time(lambda: legacy_explode(df[mask], col), repeat)
+    timings['comptage_index'], _ = best_time(lambda: index.counts(col, mask), repeat)
+
+    tables = [(x, y) for pairs in themes.values() for x, y, _ in pairs]
+    timings['tables_croisees_cube'], _ = best_time(
+        lambda: [cube.cross_tab(x, y, ('Ingénierie',)) for x, y in tables], repeat
+    )
+    timings['intervalles_bootstrap'], _ = best_time(
+        lambda: [cube.cross_tab_interval(x, y, ('Ingénierie',)) for x, y in tables], repeat
+    )
+    criteria_key = tuple(sorted((c, tuple(a)) for c, a in criteria.items()))
+    timings['tables_croisees_filtres'], cts = best_time(
+        lambda: [cube.cross_tab(x, y, (), (), criteria_key) for x, y in tables], repeat
+    )
+
+    def build_figures():
+        return [px.bar(ct, barmode='group').to_json() for ct in cts]
+    timings['figures'], _ = best_time(build_figures, repeat)
+    return timings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark des étapes du tableau de bord sur données synthétiques")
+    parser.add_argument('--tailles', type=int, nargs='+', default=DEFAULT_SIZES, help="nombres de répondants")
+    parser.add_argument('--repetitions', type=int, default=3, help="exécutions par étape (on garde la meilleure)")
+    parser.add_argument('--excel-max', type=int, default=EXCEL_MAX_ROWS,
+                        help="taille maximale pour laquelle le chargement Excel est mesuré")
+    parser.add_argument('-o', '--sortie', default='benchmark_results.jsonl', help="fichier de résultats (ajout)")
+    args = parser.parse_args(argv)
+
+    run = {
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+    }
+    with tempfile.TemporaryDirectory() as tmp, open(args.sortie, 'a', encoding='utf-8') as out:
+        for n in args.tailles:
+            timings = run_size(n, Path(tmp), args.repetitions, args.excel_max)
+            for step, seconds in timings.items():
+                out.write(json.dumps({**run, 'taille': n, 'etape': step, 'secondes': round(seconds, 6)},
+                                     ensure_ascii=False) + '\n')
+                print(f"{n:>10}  {step:<26} {seconds * 1000:>10.1f} ms")
+            out.flush()
+
+if __name__ == '__main__':
+    main()
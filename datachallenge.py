@@ -1,6 +1,10 @@
+import os
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+
+# Seuls des modules légers sont importés avant l'aperçu (voir IMPORTS DIFFÉRÉS)
+from profiling import RunProfiler, enabled_by_env
+from snapshot import filiere_figure, load_snapshot, niveau_figure, overview_counts
 
 # ---------------------------- CONFIGURATION ----------------------------
 st.set_page_config(
@@ -10,37 +14,34 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# ---------------------------- CHARGEMENT DES DONNÉES ----------------------------
-@st.cache_data
-def load_data():
-    try:
-        df = pd.read_excel('Data_challenge.xlsx')
-        return df
-    except Exception as e:
-        st.error(f"Erreur de chargement des données : {str(e)}")
-        return None
-
-df = load_data()
-if df is None:
-    st.stop()
-
-# ---------------------------- FONCTIONS UTILITAIRES ----------------------------
-def plot_cross_tab(col_x, col_y, title):
-    """Crée un graphique à barres groupées à partir d'une table croisée"""
-    try:
-        ct = pd.crosstab(df_filtered[col_x], df_filtered[col_y], normalize='index') * 100
-        fig = px.bar(
-            ct, 
-            barmode='group', 
-            title=title,
-            labels={'value': 'Pourcentage (%)', 'variable': ''},
-            color_discrete_sequence=px.colors.qualitative.Pastel
-        )
+# Barre latérale réservée dans l'ordre d'affichage : filtres, puis profilage
+sidebar_filters = st.sidebar.container()
+sidebar_profile = st.sidebar.container()
+with sidebar_profile:
+    st.markdown("---")
+    profiling_on = st.toggle("⏱️ Profilage des temps d'exécution", value=enabled_by_env())
+profiler = RunProfiler(profiling_on)
+
+def show_fragment_profile(table):
+    # Réexécution isolée d'un fragment : son récapitulatif est affiché dans le fragment lui-même
+    with st.expander("⏱️ Profilage de cette réexécution"):
+        st.dataframe(table, use_container_width=True)
+
+# ---------------------------- CACHE DES GRAPHIQUES ----------------------------
+FIGURE_CACHE_SIZE = 256
+
+@st.cache_data(max_entries=FIGURE_CACHE_SIZE, show_spinner=False)
+def show_figure(chart, state, version, _build):
+    """Affiche la figure construite par _build()
+
+    Mémorisé par graphique, état des filtres et version des données : pour une
+    vue déjà affichée, Streamlit rejoue l'élément enregistré sans reconstruire
+    ni resérialiser la figure. Au-delà de FIGURE_CACHE_SIZE graphiques, les
+    moins récemment utilisés sont évincés.
+    """
+    fig = _build()
+    with profiler.section(f'{chart[0]}/plotly'):
         st.plotly_chart(fig, use_container_width=True)
-    except KeyError as e:
-        st.error(f"Colonne manquante : {str(e)}")
-    except Exception as e:
-        st.error(f"Erreur de génération du graphique : {str(e)}")
 
 # ---------------------------- PRÉSENTATION DES DONNÉES ----------------------------
 st.title("👜 Étude d'Attractivité des Métiers Industriels - Louis Vuitton")
@@ -61,282 +62,378 @@ with col2:
 # Métriques clés
 st.markdown("---")
 st.subheader("📊 Aperçu de l'Échantillon")
-total = len(df)
-filieres = df['Filière'].nunique()
+# Emplacement réservé : rempli depuis l'instantané, ou depuis le cube une fois les données chargées
+overview = st.empty()
+
+def render_overview(total, filieres, niveaux, figures, version):
+    """Métriques et graphiques de répartition ; figures : appelables construisant les deux graphiques"""
+    with overview.container():
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Total répondants", total)
+        m2.metric("Filières représentées", len(filieres))
+        m3.metric("Niveaux d'études", len(niveaux))
+
+        # Graphiques de répartition
+        col1, col2 = st.columns(2)
+        with col1:
+            show_figure(('apercu', 'Filière'), (), version, figures[0])
+        with col2:
+            show_figure(('apercu', "Niveau d'études"), (), version, figures[1])
+
+@st.cache_resource
+def load_overview_snapshot():
+    # Instantané écrit au déploiement par `python snapshot.py`
+    return load_snapshot()
+
+with profiler.section('apercu'):
+    snapshot = load_overview_snapshot()
+    if snapshot is not None:
+        render_overview(snapshot['total'], snapshot['filieres'], snapshot['niveaux'],
+                        [lambda: snapshot['figures'][0], lambda: snapshot['figures'][1]],
+                        snapshot['source']['sha256'])
+
+# ---------------------------- IMPORTS DIFFÉRÉS ----------------------------
+# L'en-tête et l'aperçu sont déjà envoyés au navigateur : pandas, plotly et le
+# chargement des données ne retardent plus le premier affichage
+import pandas as pd
+import plotly.express as px
 
-m1, m2, m3 = st.columns(3)
-m1.metric("Total répondants", total)
-m2.metric("Filières représentées", filieres)
-m3.metric("Niveaux d'études", df["Niveau d'études"].nunique())
+from analytics import (
+    DATA_PATH, AggregateCube, Report, file_digest, memory_footprint, percentage_interval, percentages, questions, report_path,
+    themes,
+)
+from ingestion import SurveyStore, stream_cube
+from sharedcache import ResultStore, cache_dir
+from export import FORMATS, deferred_export, frame_chunks, results_table
+from interviews import INTERVIEWS_PATH, document_text, open_corpus, snippet
+from waves import WaveStore, waves_dir
 
-# Graphiques de répartition
-col1, col2 = st.columns(2)
-with col1:
-    fig = px.pie(df, names='Filière', title='Répartition par filière',
-                 color_discrete_sequence=px.colors.qualitative.Pastel)
-    st.plotly_chart(fig, use_container_width=True)
+# ---------------------------- CHARGEMENT DES DONNÉES ----------------------------
+# Mode streaming : la source est agrégée bloc par bloc, sans DataFrame ni index des répondants
+# (seuls les filtres Filière et Niveau d'études restent disponibles)
+STREAMING = os.environ.get('DATACHALLENGE_STREAMING', '').strip().lower() in ('1', 'true', 'yes', 'oui')
+@st.cache_resource
+def load_cache_dir():
+    # Cache partagé par les processus de l'hôte (répliques du serveur) ; None s'il est désactivé
+    # ou impossible à écrire. Vérifié une fois par processus, pas à chaque exécution
+    return cache_dir(DATA_PATH)
+
+SHARED_CACHE = load_cache_dir()
+
+@st.cache_resource
+def load_digest():
+    return file_digest(DATA_PATH)
+
+@st.cache_resource
+def load_results():
+    return ResultStore(SHARED_CACHE) if SHARED_CACHE else None
+
+@st.cache_resource
+def load_store():
+    # Partagé par toutes les sessions : les lots déposés y sont ajoutés sans tout recalculer
+    try:
+        return SurveyStore(DATA_PATH, shared=SHARED_CACHE)
+    except Exception as e:
+        st.error(f"Erreur de chargement des données : {str(e)}")
+        return None
 
-with col2:
-    fig = px.histogram(df, x="Niveau d'études", title='Répartition par niveau d\'études',
-                       color_discrete_sequence=['#2A9D8F'])
-    st.plotly_chart(fig, use_container_width=True)
+@st.cache_resource
+def load_streamed_cube():
+    try:
+        results = load_results()
+        if results is None:
+            return stream_cube(DATA_PATH)
+        # Une seule réplique lit la source, les autres relisent les agrégats
+        def aggregate():
+            cube = stream_cube(DATA_PATH, maxsize=0)
+            return cube.labels, cube.sizes, cube.counts
+        return AggregateCube(*results.get_or_compute(('flux', load_digest()), aggregate))
+    except Exception as e:
+        st.error(f"Erreur de chargement des données : {str(e)}")
+        return None
+
+@st.cache_resource
+def load_report():
+    # Rapport produit par `python analytics.py`, ignoré s'il ne correspond plus au classeur
+    return Report.load(report_path(DATA_PATH), load_digest())
+
+with profiler.section('chargement'):
+    survey_index = store = None
+    if STREAMING:
+        cube = load_streamed_cube()
+        if cube is None:
+            st.stop()
+    else:
+        store = load_store()
+        if store is None:
+            st.stop()
+        try:
+            # Nouveaux fichiers du dossier de lots depuis la dernière exécution
+            store.refresh()
+        except Exception as e:
+            st.error(f"Erreur d'ajout d'un lot de réponses : {str(e)}")
+        survey_index, cube = store.state
+    # Le rapport ne couvre que le classeur : inutilisable dès qu'un lot a été ajouté
+    report = load_report() if store is None or not store.batches else None
+    # Version des données servant de clé au cache des graphiques : change à chaque lot ingéré
+    data_version = len(store.batches) if store is not None else 0
+    # Clé des résultats partagés entre processus : empreinte du classeur et du contenu des lots ingérés
+    data_key = (store.key,) if store is not None else (load_digest(),)
+    results = load_results()
+
+def shared_result(key, compute):
+    """Résultat calculé une fois pour tous les processus de l'hôte, pour cette version des données"""
+    if results is None:
+        return compute()
+    return results.get_or_compute((*data_key, *key), compute)
+
+with profiler.section('apercu'):
+    # Sans instantané, ou s'il ne couvre plus les données (lots ajoutés) : marges du cube
+    if snapshot is None or (store is not None and store.batches):
+        filieres, niveaux = overview_counts(cube)
+        render_overview(int(cube.sizes.sum()), filieres, niveaux,
+                        [lambda: filiere_figure(filieres), lambda: niveau_figure(niveaux)],
+                        (data_key, 'cube'))
+
+# ---------------------------- FONCTIONS UTILITAIRES ----------------------------
+def plot_cross_tab(col_x, col_y, title, state):
+    """Crée un graphique à barres groupées à partir d'une table croisée"""
+    try:
+        with profiler.section('themes/calcul'):
+            filiere, niveau, criteria, _ = state
+            ct = report.cross_tab(col_x, col_y, filiere, niveau) if report and not criteria else None
+            if ct is None:
+                ct = shared_result(('cross_tab', col_x, col_y, state), lambda: cube.cross_tab(col_x, col_y, *state))
+
+        def build():
+            with profiler.section('themes/intervalles'):
+                low, high = shared_result(('intervalles', col_x, col_y, state),
+                                          lambda: cube.cross_tab_interval(col_x, col_y, *state))
+            with profiler.section('themes/figure'):
+                # Format long : une barre par case, avec ses barres d'erreur
+                long = ct.stack().rename('value').reset_index()
+                long['haut'] = high.stack().reindex(pd.MultiIndex.from_frame(long[[col_x, col_y]])).values
+                long['bas'] = low.stack().reindex(pd.MultiIndex.from_frame(long[[col_x, col_y]])).values
+                return px.bar(
+                    long,
+                    x=col_x,
+                    y='value',
+                    color=col_y,
+                    barmode='group', 
+                    title=title,
+                    labels={'value': 'Pourcentage (%)', col_y: ''},
+                    error_y=long['haut'] - long['value'],
+                    error_y_minus=long['value'] - long['bas'],
+                    color_discrete_sequence=px.colors.qualitative.Pastel
+                )
+        show_figure(('themes', col_x, col_y), state, data_version, build)
+    except KeyError as e:
+        st.error(f"Colonne manquante : {str(e)}")
+    except Exception as e:
+        st.error(f"Erreur de génération du graphique : {str(e)}")
 
 # ---------------------------- FILTRES ----------------------------
-with st.sidebar:
+with sidebar_filters:
     st.header("🔎 Filtres")
-    filiere = st.multiselect("Filière", options=df['Filière'].unique())
-    niveau = st.multiselect("Niveau d'études", options=df["Niveau d'études"].unique())
-
-# Application des filtres
-df_filtered = df.copy()
-if filiere:
-    df_filtered = df_filtered[df_filtered['Filière'].isin(filiere)]
-if niveau:
-    df_filtered = df_filtered[df_filtered["Niveau d'études"].isin(niveau)]
+    filiere = st.multiselect("Filière", options=cube.labels['Filière'])
+    niveau = st.multiselect("Niveau d'études", options=cube.labels["Niveau d'études"])
+
+    selection, combinaison = {}, "ET"
+    if survey_index is not None:
+        with st.expander("Filtres avancés"):
+            criteres = st.multiselect(
+                "Filtrer aussi sur",
+                options=[k for k, q in questions.items()
+                         if q['colonne'] in survey_index.labels and q['colonne'] not in ('Filière', "Niveau d'études")]
+            )
+            for key in criteres:
+                col = questions[key]['colonne']
+                selection[col] = st.multiselect(key, options=survey_index.labels[col])
+            combinaison = st.radio("Combiner ces critères avec", ["ET", "OU"], horizontal=True)
+
+# Application des filtres : opérations bit à bit sur l'index, sans copie du DataFrame
+with profiler.section('filtres'):
+    mask = None
+    if survey_index is not None:
+        bitmap = survey_index.query({'Filière': filiere, "Niveau d'études": niveau})
+        if any(selection.values()):
+            bitmap &= survey_index.query(selection, how='and' if combinaison == "ET" else 'or')
+        mask = survey_index.mask(bitmap)
+    # État des filtres sous forme hashable, clé des tables croisées mémoïsées
+    criteria = tuple(sorted((col, tuple(answers)) for col, answers in selection.items() if answers))
+    filter_state = (tuple(filiere), tuple(niveau), criteria, ('and' if combinaison == "ET" else 'or') if criteria else 'and')
 
 # ---------------------------- ANALYSE PAR QUESTION ----------------------------
 st.markdown("---")
 st.header("📋 Analyse Détailée par Question")
 
-questions = {
-    # -------------------------------
-    # A. Profil du Répondant
-    # -------------------------------
-    "Q1 - Filière d'études": {
-        "colonne": "Filière",
-        "description": "Quelle est ta filière d’études ?",
-        "options": ["Ingénierie", "Logistique - Supply Chain", "Commerce - Management", "Autre"]
-    },
-    "Q2 - Niveau d'études": {
-        "colonne": "Niveau d'études",
-        "description": "Quel est ton niveau d’études actuel ?",
-        "options": ["Bac +3", "Bac +4", "Bac +5 et plus"]
-    },
-    "Q3 - Recherche emploi": {
-        "colonne": "Recherche d'emploi",
-        "description": "As-tu déjà recherché un stage ou un emploi dans l’industrie ou la Supply Chain ?",
-        "options": ["Oui, et j'ai postulé", "Oui, mais non postulé", "Non intéressé"]
-    },
-
-    # -------------------------------
-    # B. Perception des Métiers
-    # -------------------------------
-    "Q4 - Connaissance métiers": {
-        "colonne": "Niveau de connaissance",
-        "description": "Quel est ton niveau de connaissance sur ces métiers ?",
-        "options": ["Très bon", "Moyen", "Faible", "Aucun"]
-    },
-    "Q5 - Adjectifs associés": {
-        "colonne": "Perception des métiers",
-        "description": "Quels adjectifs associes-tu spontanément à ces métiers ? (3 choix max)",
-        "options": ["Innovant", "Routinier", "Technique", "Physiquement exigeant", 
-                   "Peu valorisé", "Dynamique", "Mal payé", "Opportunités d'évolution", "Autre"]
-    },
-    "Q6 - Opportunités carrière": {
-        "colonne": "Opportunités de carrière",
-        "description": "Penses-tu que ces métiers offrent des opportunités intéressantes ?",
-        "options": ["Oui", "Peut-être", "Non"]
-    },
-    "Q7 - Freins candidature": {
-        "colonne": "Raisons de ne pas postuler",
-        "description": "Raisons de ne pas postuler ? (3 choix max)",
-        "options": ["Manque d'info", "Manque d'intérêt", "Salaire", "Image peu prestigieuse",
-                   "Travail répétitif", "Visibilité limitée", "Secteur moins innovant", "Autre"]
-    },
-
-    # -------------------------------
-    # C. Métiers dans le Luxe
-    # -------------------------------
-    "Q8 - Recrutement luxe": {
-        "colonne": "Recrutement dans le luxe",
-        "description": "Penses-tu que le luxe recrute dans ces domaines ?",
-        "options": ["Oui avec opportunités", "Oui sans détails", "Non"]
-    },
-    "Q9 - Perception luxe": {
-        "colonne": "Intérêt pour le luxe",
-        "description": "Travailler dans le luxe est...",
-        "options": ["Plus valorisant", "Aussi intéressant", "Moins intéressant"]
-    },
-    "Q10 - A priori négatifs": {
-        "colonne": "A priori négatifs",
-        "description": "As-tu des a priori négatifs sur ces métiers dans le luxe ?",
-        "options": ["Moins bien considérés", "Moins innovants", "Aussi intéressants", "Lien artisanat"]
-    },
-
-    # -------------------------------
-    # D. Attentes et Canaux
-    # -------------------------------
-    "Q11 - Motivations": {
-        "colonne": "Motivations",
-        "description": "Qu'est-ce qui te motiverait ? (3 choix max)",
-        "options": ["Salaire", "Évolution", "Rôle industrie", "Communication moderne", 
-                   "Collaborations écoles", "Rien"]
-    },
-    "Q12 - Canaux information": {
-        "colonne": "Canaux d'information",
-        "description": "Quels canaux t'influencent ? (3 choix max)",
-        "options": ["Réseaux sociaux", "Salons", "Témoignages", "Visites entreprises", 
-                   "Contenus en ligne", "Autre"]
-    },
-    "Q13 - Initiatives motivantes": {
-        "colonne": "Initiatives motivantes",
-        "description": "Initiatives pour découvrir les métiers ? (3 choix max)",
-        "options": ["Témoignages", "Expérience immersive", "Hackathons", "Ateliers/conférences", 
-                   "Campagnes réseaux", "Autre"]
-    }
-}
-
-selected_question = st.selectbox(
-    "Sélectionnez une question :",
-    options=list(questions.keys()),
-    index=0
-)
+# Fragment : changer de question ne relance que cette section
+@st.fragment
+@profiler.fragment('question', show_fragment_profile)
+def render_question_explorer(mask, state):
+    selected_question = st.selectbox(
+        "Sélectionnez une question :",
+        options=list(questions.keys()),
+        index=0
+    )
 
-q_data = questions[selected_question]
+    q_data = questions[selected_question]
 
-try:
-    with st.expander(f"**{selected_question}** : {q_data['description']}", expanded=True):
-        if df_filtered[q_data['colonne']].str.contains('/').any():
-            reponses = df_filtered[q_data['colonne']].str.split('/').explode().str.strip()
-        else:
-            reponses = df_filtered[q_data['colonne']].dropna()
-        
-        counts = reponses.value_counts(normalize=True).mul(100).round(1)
+    try:
+        with st.expander(f"**{selected_question}** : {q_data['description']}", expanded=True):
+            filiere, niveau, criteria, _ = state
+            if criteria:
+                # Somme des indicatrices sur les lignes filtrées, sans découpage de chaînes
+                mentions = shared_result(('mentions', q_data['colonne'], state),
+                                         lambda: survey_index.counts(q_data['colonne'], mask))
+            else:
+                mentions = cube.distribution(q_data['colonne'], filiere, niveau)
+            counts = report.distribution(q_data['colonne'], filiere, niveau) if report and not criteria else None
+            if counts is None:
+                counts = percentages(mentions)
+            # Bootstrap sur les mentions : les bornes s'élargissent sur les petits segments
+            interval = percentage_interval(mentions).reindex(counts.index)
         
-        df_plot = pd.DataFrame({
-            'Réponse': counts.index,
-            'Pourcentage': counts.values
-        }).sort_values('Pourcentage', ascending=False)
-
-        fig = px.bar(
-            df_plot,
-            x='Réponse',
-            y='Pourcentage',
-            title=f"Répartition des réponses",
-            labels={'Pourcentage': 'Pourcentage (%)'},
-            color='Réponse',
-            color_discrete_sequence=px.colors.qualitative.Pastel
-        )
-        fig.update_layout(showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
+            df_plot = pd.DataFrame({
+                'Réponse': counts.index,
+                'Pourcentage': counts.values,
+                'IC 95 % bas': interval['bas'].values,
+                'IC 95 % haut': interval['haut'].values
+            }).sort_values('Pourcentage', ascending=False)
+
+            def build():
+                with profiler.section('question/figure'):
+                    fig = px.bar(
+                        df_plot,
+                        x='Réponse',
+                        y='Pourcentage',
+                        title=f"Répartition des réponses",
+                        labels={'Pourcentage': 'Pourcentage (%)'},
+                        color='Réponse',
+                        error_y=df_plot['IC 95 % haut'] - df_plot['Pourcentage'],
+                        error_y_minus=df_plot['Pourcentage'] - df_plot['IC 95 % bas'],
+                        color_discrete_sequence=px.colors.qualitative.Pastel
+                    )
+                    fig.update_layout(showlegend=False)
+                return fig
+            show_figure(('question', q_data['colonne']), state, data_version, build)
         
-        st.markdown("**Détail des pourcentages :**")
-        st.dataframe(df_plot.set_index('Réponse'), use_container_width=True)
+            st.markdown("**Détail des pourcentages :**")
+            st.dataframe(df_plot.set_index('Réponse'), use_container_width=True)
 
-except KeyError:
-    st.error(f"Colonne '{q_data['colonne']}' non trouvée")
-except Exception as e:
-    st.error(f"Erreur lors de l'analyse : {str(e)}")
+    except KeyError:
+        st.error(f"Colonne '{q_data['colonne']}' non trouvée")
+    except Exception as e:
+        st.error(f"Erreur lors de l'analyse : {str(e)}")
+
+render_question_explorer(mask, filter_state)
 
 # ---------------------------- ANALYSE QUANTITATIVE ----------------------------
 st.markdown("---")
 st.header("📈 Analyse Thématique")
 
-tabs = st.tabs(["Perception des Métiers", "Attractivité", "Freins", "Leviers"])
-
-with tabs[0]:
-    plot_cross_tab('Filière', 'Niveau de connaissance', 'Connaissance par filière')
-    plot_cross_tab("Niveau d'études", 'Perception des métiers', 'Perception par niveau')
+# Fragment : seul l'onglet affiché est calculé (st.tabs exécuterait le contenu des quatre)
+@st.fragment
+@profiler.fragment('themes', show_fragment_profile)
+def render_themes(state):
+    theme = st.radio("Thème", list(themes), horizontal=True, label_visibility="collapsed")
+    for col_x, col_y, title in themes[theme]:
+        plot_cross_tab(col_x, col_y, title, state)
+
+render_themes(filter_state)
+
+# ---------------------------- COMPARAISON DES VAGUES ----------------------------
+@st.cache_resource
+def load_waves():
+    # Partitions écrites par `python waves.py ajouter <vague> <export>` ; seules celles comparées sont lues
+    return WaveStore(waves_dir(DATA_PATH))
+
+# Fragment : changer de vague ou de question ne relance que cette section
+@st.fragment
+@profiler.fragment('vagues', show_fragment_profile)
+def render_waves(waves, state):
+    col1, col2, col3 = st.columns([1, 1, 3])
+    before = col1.selectbox("Vague de référence", waves, index=len(waves) - 2)
+    after = col2.selectbox("Vague comparée", waves, index=len(waves) - 1)
+    selected_question = col3.selectbox("Question", list(questions), key='question_vagues')
+    col = questions[selected_question]['colonne']
+    try:
+        table = wave_store.evolution(col, before, after, *state)
+        # Version des partitions : change quand une vague est réingérée
+        version = tuple(wave_store.version(wave) for wave in (before, after))
+
+        def build():
+            with profiler.section('vagues/figure'):
+                long = table[[before, after]].rename_axis('Réponse').reset_index().melt(
+                    id_vars='Réponse', var_name='Vague', value_name='Pourcentage')
+                return px.bar(
+                    long,
+                    x='Réponse',
+                    y='Pourcentage',
+                    color='Vague',
+                    barmode='group',
+                    title=f"{selected_question} : {before} et {after}",
+                    labels={'Pourcentage': 'Pourcentage (%)'},
+                    color_discrete_sequence=px.colors.qualitative.Pastel
+                )
+        show_figure(('vagues', col, before, after), state, version, build)
+        st.dataframe(table, use_container_width=True)
+    except KeyError as e:
+        st.error(f"Vague ou colonne introuvable : {str(e)}")
+    except Exception as e:
+        st.error(f"Erreur de comparaison des vagues : {str(e)}")
 
-with tabs[1]:
-    plot_cross_tab('Filière', 'Intérêt pour le luxe', 'Intérêt par filière')
-    plot_cross_tab("Niveau d'études", 'Opportunités de carrière', 'Opportunités par niveau')
+wave_store = load_waves()
+waves = wave_store.waves()
+if len(waves) >= 2:
+    st.markdown("---")
+    st.header("📅 Évolution d'une vague à l'autre")
+    render_waves(waves, filter_state)
 
-with tabs[2]:
-    plot_cross_tab('Filière', 'Raisons de ne pas postuler', 'Freins principaux')
-    plot_cross_tab("Niveau d'études", 'A priori négatifs', 'A priori par niveau')
+# ---------------------------- EXPORT ----------------------------
+st.markdown("---")
+st.header("📥 Export")
+
+# Fragment : changer de format ne relance pas la page ; le fichier n'est produit qu'au clic
+@st.fragment
+@profiler.fragment('export', show_fragment_profile)
+def render_export(mask, state):
+    fmt = st.radio("Format du fichier", list(FORMATS), horizontal=True)
+    extension, mime = FORMATS[fmt]
+    col1, col2 = st.columns(2)
+    if store is not None:
+        col1.download_button(
+            "Télécharger les répondants filtrés",
+            data=deferred_export(lambda: frame_chunks(store.data(), mask), fmt),
+            file_name=f'reponses_filtrees{extension}',
+            mime=mime
+        )
+    col2.download_button(
+        "Télécharger les distributions et tables croisées",
+        data=deferred_export(lambda: [results_table(cube, state, survey_index, mask)], fmt),
+        file_name=f'resultats{extension}',
+        mime=mime
+    )
 
-with tabs[3]:
-    plot_cross_tab('Filière', 'Motivations', 'Motivations par filière')
-    plot_cross_tab("Niveau d'études", 'Initiatives motivantes', 'Initiatives par niveau')
+render_export(mask, filter_state)
 
 # ------------------ SECTION DONNÉES QUALITATIVES ------------------
 
 st.header("Données qualitatives : Interviews et synthèse")
 
-# Dictionnaire des profils et interviews
-profils = {
-    "Émilie, 20 ans, BAC Pro Maintenance": {
-        "contexte": "Émilie termine son bac pro et hésite à postuler dans le luxe",
-        "objectifs": "Comprendre les freins des profils techniques non diplômés du supérieur",
-        "interview": [
-            "En CFA on nous parle jamais du luxe J’pensais qu’ils prenaient que des ingénieurs Un prof m’a dit que LV recrute des techniciens mais j’ose pas Si y’avait des portes ouvertes dans leurs ateliers j’irais",
-            "Mon stage chez un sous-traitant auto c’était que de la routine Si LV propose des formations pour monter en compétences ça m’motiverait"
-        ]
-    },
-    "Raj, 24 ans, Master Logistique (Inde)": {
-        "contexte": "Raj cherche un stage en Europe et s’interroge sur le luxe",
-        "objectifs": "Explorer l’attractivité internationale des métiers Supply Chain",
-        "interview": [
-            "En Inde Louis Vuitton est un rêve Mais je ne savais pas qu’ils avaient des usines en Europe Leur site indien ne mentionne pas ces métiers",
-            "Si LV organisait des webinaires en anglais pour expliquer leurs défis logistiques globaux je postulerais Mais leurs offres sont trop franco françaises"
-        ]
-    },
-    "Hugo, 28 ans, reconversion tech": {
-        "contexte": "Hugo quitte la tech pour se rapprocher de l’artisanat",
-        "objectifs": "Capter l’intérêt des profils en reconversion",
-        "interview": [
-            "J’ai démissionné d’une startup pour retrouver du concret LV m’intéresse car ils mélangent artisanat et industrie Mais comment postuler sans expérience luxe",
-            "Leurs offres demandent 5 ans d’expérience en maroquinerie Pourquoi pas des programmes pour reconvertis motivés"
-        ]
-    },
-    "Fatima, 22 ans, BTS Qualité (handicap)": {
-        "contexte": "Fatima cherche une entreprise inclusive pour son alternance",
-        "objectifs": "Évaluer l’accessibilité des métiers industriels",
-        "interview": [
-            "J’ai peur que les ateliers de LV ne soient pas adaptés aux fauteuils roulants Leur site parle de diversité mais montre t il des employés en situation de handicap",
-            "Si LV collaborait avec mon école pour aménager des postes ça montrerait un vrai engagement"
-        ]
-    },
-    "Nathan, 26 ans, entrepreneur upcycling": {
-        "contexte": "Nathan crée des vêtements à partir de déchets industriels",
-        "objectifs": "Explorer les synergies entre luxe et économie circulaire",
-        "interview": [
-            "LV a un programme de récupération de chutes de cuir mais c’est confidentiel Pourquoi ne pas en faire un argument pour attirer des profils écolos comme moi",
-            "Travailler chez eux pour repenser leur supply chain en mode zéro déchet Oui mais seulement s’ils ont une vraie volonté de changer"
-        ]
-    },
-    "Lise, 19 ans, Licence design mode": {
-        "contexte": "Lise grandit dans un atelier familial et méprise l’industrie",
-        "objectifs": "Comprendre le clivage artisanat vs production de masse",
-        "interview": [
-            "Mon père répare des sacs LV vintage Il dit Avant c’était fait pour durer Maintenant c’est de la production en série",
-            "Si LV m’expliquait comment ils forment leurs artisans et préservent la qualité je reconsidererais Mais j’ai peur que l’industrie tue le savoir faire"
-        ]
-    },
-    "Marco, 30 ans, Livreur en reprise d’études": {
-        "contexte": "Marco reprend un BTS Logistique après une carrière dans la restauration",
-        "objectifs": "Capter les attentes des profils non traditionnels",
-        "interview": [
-            "J’ai postulé chez Amazon mais leurs entrepôts sont des mouroirs LV j’imagine que c’est mieux Mais comment le savoir Y’a rien sur Glassdoor",
-            "Si LV proposait des stages découverte pour adultes en reconversion j’serais preneur Mais leurs offres s’adressent aux moins de 25 ans"
-        ]
-    },
-    "Aïda, 27 ans, consultante digital nomade": {
-        "contexte": "Aïda travaille à distance et s’intéresse aux supply chains connectées",
-        "objectifs": "Attirer les profils tech adeptes de flexibilité",
-        "interview": [
-            "Je pourrais optimiser leurs flux depuis Bali mais LV a l’air trop rigide Leur mention présentiel obligatoire dans les offres me refroidit",
-            "S’ils digitalisaient leurs processus et permettaient le télétravail partiel je les verrais comme un employeur innovant"
-        ]
-    },
-    "Thomas, 35 ans, reconversion professionnelle": {
-        "contexte": "Thomas quitte la construction pour chercher un métier stable",
-        "objectifs": "Comprendre l’attrait des métiers industriels pour les profils matures",
-        "interview": [
-            "À mon âge je cherche la stabilité LV est une entreprise solide mais j’ai l’impression qu’ils privilégient les jeunes diplômés",
-            "Si LV communiquait sur les parcours internes genre Devenez chef d’atelier en 5 ans ça donnerait espoir aux trentenaires comme moi"
-        ]
-    },
-    "Zoé, 18 ans, Lycéenne STI2D": {
-        "contexte": "Zoé choisit son orientation post bac",
-        "objectifs": "Capter les jeunes talents dès le lycée",
-        "interview": [
-            "En cours on visite des usines automobiles jamais des ateliers de luxe Si LV organisait des journées Découverte métiers pour lycéens je m’inscrirais",
-            "Mes potes pensent que l’industrie c’est pour les garçons Si LV montrait des femmes ingénieures ou cheffes d’atelier ça casserait les clichés"
-        ]
-    }
-}
+# Entretiens lus depuis le fichier externe, avec leur index de recherche plein texte
+@st.cache_resource
+def load_interviews():
+    try:
+        return open_corpus(INTERVIEWS_PATH)
+    except Exception as e:
+        st.error(f"Erreur de chargement des entretiens : {str(e)}")
+        return None, None
+
+# Résultats de recherche affichés au plus
+MAX_HITS = 20
+
+profils, interview_index = load_interviews()
 
 # Synthèse/conseils pour Louis Vuitton
 synthese = """
@@ -349,19 +446,42 @@ Conseils principaux :
 - Mettre en avant l’innovation, la digitalisation, la collaboration entre métiers et la dimension internationale de la supply chain
 """
 
-# Sélection du profil
-profil_choisi = st.selectbox(
-    "Sélectionnez un profil pour lire son interview",
-    list(profils.keys())
-)
-
-# Affichage du contenu de l'interview
-st.subheader(f"Profil : {profil_choisi}")
-st.write(f"Contexte : {profils[profil_choisi]['contexte']}")
-st.write(f"Objectif : {profils[profil_choisi]['objectifs']}")
-st.write("Interview :")
-for phrase in profils[profil_choisi]['interview']:
-    st.write(f"- {phrase}")
+# Fragment : changer de profil ne recalcule aucun graphique
+@st.fragment
+@profiler.fragment('entretiens', show_fragment_profile)
+def render_interviews():
+    # Recherche dans tout le corpus : l'index inversé évite de parcourir chaque entretien
+    recherche = st.text_input("Rechercher dans les entretiens", placeholder='mots, "expression exacte" ou préfixe*')
+    themes_choisis = st.multiselect(
+        "Thèmes abordés",
+        options=list(interview_index.tags),
+        format_func=lambda theme: f"{theme} ({len(interview_index.tags[theme])})"
+    )
+    if recherche or themes_choisis:
+        hits = interview_index.search(recherche, themes_choisis)
+        st.caption(f"{len(hits)} résultat(s) trouvé(s)")
+        for doc, _, positions in hits[:MAX_HITS]:
+            profil, field, i = interview_index.docs[doc]
+            # Résultat dans la fiche du profil : le champ est précisé
+            where = '' if field == 'interview' else f" ({field})"
+            st.markdown(f"**{profil}**{where} : {snippet(document_text(profils, profil, field, i), positions)}")
+
+    # Sélection du profil
+    profil_choisi = st.selectbox(
+        "Sélectionnez un profil pour lire son interview",
+        list(profils.keys())
+    )
+
+    # Affichage du contenu de l'interview
+    st.subheader(f"Profil : {profil_choisi}")
+    st.write(f"Contexte : {profils[profil_choisi]['contexte']}")
+    st.write(f"Objectif : {profils[profil_choisi]['objectifs']}")
+    st.write("Interview :")
+    for phrase in profils[profil_choisi]['interview']:
+        st.write(f"- {phrase}")
+
+if profils:
+    render_interviews()
 
 st.markdown("---")
 st.subheader("Synthèse et conseils pour Louis Vuitton")
@@ -387,4 +507,23 @@ st.markdown("---")
 st.caption("""
 *Étude réalisée par Ilias Khafague - Données collectées en 2025*  
 *© 2025 Louis Vuitton - Données confidentielles*
-""")
\ No newline at end of file
+""")
+
+# ---------------------------- PROFILAGE ----------------------------
+@st.cache_data(max_entries=1, show_spinner=False)
+def load_footprint(version):
+    # Mémoire des réponses chargées : chaînes d'origine contre catégories et bitmaps de l'index
+    # (appelé seulement si le classeur est déjà en mémoire : ne le charge jamais pour le profilage)
+    return memory_footprint(store.data(), store.index).sum()
+
+if profiler.enabled:
+    profiler.summary()
+    with sidebar_profile:
+        st.dataframe(profiler.table(), use_container_width=True)
+        if store is not None and store.loaded:
+            footprint = load_footprint(data_key)
+            st.caption(f"Mémoire des réponses : {(footprint['Compact'] + footprint['Index']) / 2**20:.2f} Mo "
+                       f"(contre {footprint['Chaînes'] / 2**20:.2f} Mo en chaînes)")
+        elif store is not None:
+            # Mode partagé : réponses non chargées, seul l'index mappé est en mémoire
+            st.caption(f"Index des répondants (mappé) : {store.index.nbytes / 2**20:.2f} Mo, réponses non chargées")
@@ -0,0 +1,135 @@
+"""Export des réponses filtrées et des résultats calculés, en CSV, Parquet ou XLSX.
+
+Le fichier n'est produit qu'à la demande : les lignes sont écrites bloc par
+bloc dans un fichier temporaire sur disque, sans construire le DataFrame
+filtré ni le fichier complet en mémoire.
+"""
+import io
+import tempfile
+
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from analytics import percentage_interval, percentages, questions, themes
+
+EXPORT_CHUNK_ROWS = 50_000
+# Au-delà, le fichier temporaire passe de la mémoire au disque
+SPOOL_BYTES = 8 * 2**20
+
+FORMATS = {
+    'CSV': ('.csv', 'text/csv'),
+    'Parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'XLSX': ('.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+class FrameChunks:
+    """Blocs successifs des lignes de df retenues par le masque, avec le schéma Arrow de tout le DataFrame"""
+
+    def __init__(self, df, mask=None, chunksize=EXPORT_CHUNK_ROWS):
+        self.df, self.mask, self.chunksize = df, mask, chunksize
+
+    @property
+    def schema(self):
+        # Déduit de toutes les lignes : une colonne vide dans le premier bloc n'est pas typée « null »
+        return pa.Schema.from_pandas(self.df, preserve_index=False)
+
+    def __iter__(self):
+        df = self.df
+        positions = np.flatnonzero(self.mask) if self.mask is not None else np.arange(len(df))
+        if not len(positions):
+            # Aucune ligne retenue : un bloc vide, pour que l'en-tête ou le schéma soit tout de même écrit
+            yield df.iloc[:0]
+        for start in range(0, len(positions), self.chunksize):
+            yield df.iloc[positions[start:start + self.chunksize]]
+
+def frame_chunks(df, mask=None, chunksize=EXPORT_CHUNK_ROWS):
+    """Blocs successifs des lignes de df retenues par le masque"""
+    return FrameChunks(df, mask, chunksize)
+
+def _write_csv(chunks, out):
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='')
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(text, header=i == 0, index=False)
+    text.flush()
+    text.detach()
+
+def _write_parquet(chunks, out):
+    # Schéma de tout le DataFrame s'il est connu (FrameChunks), sinon celui du premier bloc
+    schema = getattr(chunks, 'schema', None)
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(out, table.schema)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+def _write_xlsx(chunks, out):
+    import openpyxl
+
+    # Classeur en écriture seule : les lignes sont envoyées au fichier au fil de l'eau
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Export')
+    for i, chunk in enumerate(chunks):
+        if i == 0:
+            sheet.append(list(chunk.columns))
+        for row in chunk.astype(object).itertuples(index=False):
+            sheet.append([None if pd.isna(value) else value for value in row])
+    workbook.save(out)
+
+WRITERS = {'CSV': _write_csv, 'Parquet': _write_parquet, 'XLSX': _write_xlsx}
+
+def export_file(chunks, fmt='CSV'):
+    """Fichier temporaire (rembobiné) contenant les blocs au format demandé"""
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    try:
+        WRITERS[fmt](chunks, out)
+    except BaseException:
+        out.close()
+        raise
+    out.seek(0)
+    return out
+
+def deferred_export(chunks_factory, fmt='CSV'):
+    """Appelable sans argument pour st.download_button : l'export n'est calculé qu'au clic"""
+    def build():
+        # Streamlit attend des octets : seul le fichier final est relu en mémoire
+        with export_file(chunks_factory(), fmt) as out:
+            return out.read()
+    return build
+
+def results_table(cube, state, index=None, mask=None, questions=questions, themes=themes):
+    """Distributions de chaque question et tables croisées des thèmes pour l'état des filtres, en format long"""
+    filiere, niveau, criteria, how = state
+    rows = []
+    for key, q in questions.items():
+        col = q['colonne']
+        if col not in cube.labels:
+            continue
+        if criteria and index is not None:
+            mentions = index.counts(col, mask)
+        else:
+            mentions = cube.distribution(col, filiere, niveau)
+        shares, interval = percentages(mentions), percentage_interval(mentions)
+        for answer, share in shares.items():
+            rows.append([key, '', answer, int(mentions[answer]), share,
+                         interval.at[answer, 'bas'], interval.at[answer, 'haut']])
+    for theme, tables in themes.items():
+        for col_x, col_y, title in tables:
+            if col_x not in cube.labels or col_y not in cube.labels:
+                continue
+            counts = cube.cross_counts(col_x, col_y, *state)
+            shares = cube.cross_tab(col_x, col_y, *state)
+            low, high = cube.cross_tab_interval(col_x, col_y, *state)
+            for row in counts.index:
+                for answer in counts.columns:
+                    rows.append([f'{theme} - {title}', row, answer, int(counts.at[row, answer]),
+                                 round(shares.at[row, answer], 1), round(low.at[row, answer], 1),
+                                 round(high.at[row, answer], 1)])
+    return pd.DataFrame(rows, columns=['Tableau', 'Ligne', 'Réponse', 'Mentions', 'Pourcentage',
+                                       'IC 95 % bas', 'IC 95 % haut'])
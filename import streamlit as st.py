@@ -1,9 +1,11 @@
+import functools
+
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import plotly.express as px
 
+from export import deferred_export, frame_chunks
+
 # Configuration de la page
 st.set_page_config(page_title="Analyse Métiers LV", layout="wide")
 
@@ -86,7 +88,8 @@ with st.expander("Exploration des données brutes"):
     st.dataframe(df.style.highlight_max(axis=0), use_container_width=True)
     st.download_button(
         label="Télécharger les données filtrées",
-        data=df.to_csv(index=False).encode('utf-8'),
+        # Fichier produit seulement au clic, par blocs de lignes
+        data=deferred_export(functools.partial(frame_chunks, df), 'CSV'),
         file_name='donnees_filtrees.csv',
         mime='text/csv'
     )
@@ -94,7 +97,7 @@ with st.expander("Exploration des données brutes"):
 # Instructions pour lancer l'app
 st.markdown("""
 **Comment utiliser cette application :**
-1. Installez les dépendances : `pip install streamlit pandas matplotlib seaborn plotly openpyxl`
+1. Installez les dépendances : `pip install streamlit pandas plotly openpyxl`
 2. Lancez avec : `streamlit run nom_du_fichier.py`
 3. Utilisez les filtres dans la sidebar pour affiner les analyses
 """)
@@ -0,0 +1,296 @@
+"""Ingestion en streaming des exports de l'enquête.
+
+La source (xlsx lu en lecture seule par openpyxl, ou CSV) est lue par blocs
+de lignes et chaque bloc est aussitôt replié dans les cubes de comptage :
+la mémoire dépend du nombre de réponses possibles, pas du nombre de
+répondants.
+
+    python ingestion.py export_campus.csv -o export_campus.rapport.json
+
+Les réponses arrivées après coup se déposent dans un dossier de lots
+(SurveyStore) : seuls les nouveaux fichiers sont lus et ajoutés à l'index
+et aux cubes existants.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+import numpy as np
+
+from analytics import (
+    DATA_PATH, AggregateCube, BitmapIndex, build_report, compact_survey, count_cells, file_digest, ordered_labels,
+    questions, read_survey, report_path, split_answers, write_report,
+)
+from sharedcache import ResultStore, shared_index
+
+CHUNK_ROWS = 50_000
+
+def iter_chunks(path, chunksize=CHUNK_ROWS):
+    """Blocs successifs de lignes (DataFrames) d'un fichier .xlsx ou .csv"""
+    path = Path(path)
+    if path.suffix == '.csv':
+        with pd.read_csv(path, chunksize=chunksize) as reader:
+            yield from reader
+    elif path.suffix in ('.xlsx', '.xlsm'):
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            while header is not None:
+                block = list(itertools.islice(rows, chunksize))
+                if not block:
+                    break
+                yield pd.DataFrame(block, columns=header)
+        finally:
+            workbook.close()
+    else:
+        raise ValueError(f"Format non supporté : {path.suffix}")
+
+def _pad(array, shape):
+    """Agrandit un tableau de comptage (zéros ajoutés en fin de chaque axe)"""
+    if array.shape == shape:
+        return array
+    padded = np.zeros(shape, dtype=array.dtype)
+    padded[tuple(slice(0, n) for n in array.shape)] = array
+    return padded
+
+class CubeBuilder:
+    """Replie des blocs de réponses dans des cubes de comptage dont le vocabulaire s'étend au fil de l'eau
+
+    En interne, la case « non renseigné » de chaque axe Filière / Niveau est
+    la première ; cube() remet les axes dans l'ordre d'AggregateCube.
+    """
+
+    def __init__(self, questions=questions):
+        self.questions = {q['colonne']: q for q in questions.values()}
+        self.labels = {}      # colonne -> réponses, dans l'ordre de première apparition
+        self._positions = {}  # colonne -> {réponse: position}
+        self.sizes = np.zeros((1, 1), dtype=np.int64)
+        self.counts = {}
+        self.n_rows = 0
+
+    def _encode(self, col, values):
+        """Matrice indicatrice d'un bloc ; les réponses inédites sont ajoutées au vocabulaire"""
+        labels = self.labels.setdefault(col, [])
+        positions = self._positions.setdefault(col, {})
+        # Le découpage ne porte que sur les valeurs distinctes du bloc
+        codes, uniques = pd.factorize(values)
+        uniques = pd.Series(uniques, dtype=object).astype(str)
+        if self.questions[col].get('multiple'):
+            answers = split_answers(uniques).str.split('|')
+        else:
+            answers = uniques.map(lambda value: [value.strip()])
+        for parts in answers:
+            for label in parts:
+                if label and label not in positions:
+                    positions[label] = len(labels)
+                    labels.append(label)
+        # Dernière ligne : valeur manquante, aucune réponse
+        unique_matrix = np.zeros((len(uniques) + 1, len(labels)), dtype=bool)
+        for i, parts in enumerate(answers):
+            unique_matrix[i, [positions[label] for label in parts if label]] = True
+        return unique_matrix[codes]
+
+    def add(self, chunk):
+        """Ajoute un bloc de répondants aux cubes"""
+        axes = []
+        for col in AggregateCube.AXES:
+            matrix = self._encode(col, chunk[col])
+            axes.append(np.where(matrix.any(axis=1), matrix.argmax(axis=1) + 1, 0))
+        shape = tuple(len(self.labels[col]) + 1 for col in AggregateCube.AXES)
+        cells = axes[0].astype(np.int64) * shape[1] + axes[1]
+
+        self.sizes = _pad(self.sizes, shape)
+        self.sizes += np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape)
+        for col in self.questions:
+            if col not in chunk:
+                continue
+            matrix = self._encode(col, chunk[col])
+            current = self.counts.get(col, np.zeros((*shape, 0), dtype=np.int64))
+            self.counts[col] = _pad(current, (*shape, matrix.shape[1]))
+            self.counts[col] += count_cells(cells, matrix, shape)
+        for col in self.counts:
+            self.counts[col] = _pad(self.counts[col], (*shape, self.counts[col].shape[2]))
+        self.n_rows += len(chunk)
+
+    def cube(self, maxsize=256):
+        """Cube d'agrégation figé, réponses ordonnées comme le questionnaire"""
+        labels, order = {}, {}
+        for col in self.labels:
+            q = self.questions[col]
+            # Réponses hors questionnaire : même ordre que BitmapIndex (alphabétique pour les choix multiples,
+            # comme get_dummies ; ordre d'apparition pour les choix uniques)
+            seen = sorted(self.labels[col]) if q.get('multiple') else self.labels[col]
+            labels[col] = ordered_labels(q, seen)
+            order[col] = [self._positions[col][label] for label in labels[col]]
+        # Case « non renseigné » (position 0 en interne) remise en dernier
+        f, n = ([p + 1 for p in order[col]] + [0] for col in AggregateCube.AXES)
+        sizes = self.sizes[np.ix_(f, n)]
+        counts = {col: self.counts[col][np.ix_(f, n, order[col])] for col in self.counts}
+        return AggregateCube({col: labels[col] for col in self.counts}, sizes, counts, maxsize=maxsize)
+
+def stream_cube(path, questions=questions, chunksize=CHUNK_ROWS, maxsize=256):
+    """Cube d'agrégation d'un export lu bloc par bloc, sans jamais le charger en entier"""
+    builder = CubeBuilder(questions)
+    for chunk in iter_chunks(path, chunksize):
+        builder.add(chunk)
+    return builder.cube(maxsize)
+
+# ---------------------------- AJOUT DE LOTS ----------------------------
+def drop_dir(source=DATA_PATH):
+    """Dossier où déposer les nouveaux lots de réponses (DATACHALLENGE_DROP pour le déplacer)"""
+    return Path(os.environ.get('DATACHALLENGE_DROP') or Path(source).with_name('nouvelles_reponses'))
+
+def read_batch(path):
+    """Lot de réponses déposé : .xlsx (via le cache Arrow) ou .csv"""
+    path = Path(path)
+    if path.suffix == '.csv':
+        return compact_survey(pd.read_csv(path))
+    return read_survey(path)
+
+class SurveyStore:
+    """Réponses du classeur principal et des lots ajoutés ensuite, avec index et cube tenus à jour par ajout
+
+    Un ajout ne lit, ne découpe et ne compte que le nouveau lot. L'index et
+    le cube sont remplacés ensemble (attribut state) : une exécution en cours
+    garde une vue cohérente pendant qu'un autre utilisateur déclenche un ajout.
+
+    Avec un dossier de cache partagé (shared), l'index est mappé depuis ce
+    dossier et le cube relu depuis le magasin de résultats : seul le premier
+    processus de l'hôte les calcule, et le DataFrame n'est chargé que si on le
+    demande (data()). Après chaque lot, l'index agrandi y est aussi écrit, sous
+    l'empreinte du classeur et des lots : les répliques qui ingèrent les mêmes
+    lots continuent de partager une seule copie. Si le dossier n'est pas
+    accessible en écriture, tout est tenu en mémoire.
+    """
+
+    def __init__(self, source=DATA_PATH, folder=None, questions=questions, shared=None):
+        self.source = Path(source)
+        self.folder = Path(folder) if folder else drop_dir(source)
+        self.questions = questions
+        # Empreinte du classeur et du questionnaire : clé de l'index initial
+        spec = json.dumps(questions, sort_keys=True, ensure_ascii=False)
+        self.digest = hashlib.sha256((file_digest(self.source) + spec).encode('utf-8')).hexdigest()
+        # Empreinte des données ingérées (classeur, puis nom et contenu de chaque lot) : clé de l'index
+        # et des résultats partagés
+        self.key = self.digest
+        self.frames = [None]  # classeur lu à la demande
+        self.shared = shared
+        index = cube = None
+        if shared is not None:
+            try:
+                index, cube = self._shared_state(lambda: BitmapIndex(self._main_frame(), questions),
+                                                 lambda index: AggregateCube.from_index(index, maxsize=0))
+            except OSError:
+                # Cache partagé devenu inaccessible : index et cube en mémoire
+                self.shared = None
+        if index is None:
+            index = BitmapIndex(self._main_frame(), questions)
+            cube = AggregateCube.from_index(index)
+        self.state = (index, cube)
+        self.batches = []  # noms des lots déjà ingérés, dans l'ordre
+        self._lock = threading.RLock()
+
+    @property
+    def index(self):
+        return self.state[0]
+
+    @property
+    def cube(self):
+        return self.state[1]
+
+    def _shared_state(self, build_index, build_cube):
+        """Index mappé et cube relus du cache partagé sous self.key, calculés par le premier processus qui les demande"""
+        index = shared_index(build_index, self.key, self.shared)
+
+        def aggregate():
+            cube = build_cube(index)
+            return cube.labels, cube.sizes, cube.counts
+        # Cube partagé sans son index : les tableaux mappés se pickleraient en copie
+        labels, sizes, counts = ResultStore(self.shared).get_or_compute(('cube', self.key), aggregate)
+        return index, AggregateCube(labels, sizes, counts, index)
+
+    def ingest(self, df, name=None):
+        """Ajoute un lot de répondants ; coût proportionnel à la taille du lot"""
+        with self._lock:
+            index, cube = self.state
+            start = index.n_rows
+            name = name or f'lot {len(self.batches) + 1}'
+            # Le contenu du lot entre dans la clé : deux lots de même nom ne se confondent pas
+            content = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).values.tobytes()).hexdigest()
+            self.key = hashlib.sha256(f'{self.key}|{name}|{content}'.encode('utf-8')).hexdigest()
+            state = None
+            if self.shared is not None:
+                try:
+                    state = self._shared_state(lambda: index.append(df, self.questions),
+                                               lambda new: cube.extend(new, start))
+                except OSError:
+                    # Cache partagé devenu inaccessible : la suite des lots est tenue en mémoire
+                    self.shared = None
+            if state is None:
+                new = index.append(df, self.questions)
+                state = (new, cube.extend(new, start))
+            self.state = state
+            self.frames.append(df)
+            self.batches.append(name)
+        return len(df)
+
+    def refresh(self):
+        """Ingère les fichiers du dossier de lots pas encore vus ; renvoie le nombre de lignes ajoutées"""
+        if not self.folder.is_dir():
+            return 0
+        added = 0
+        # Verrou tenu pendant tout le parcours : deux sessions ne peuvent pas ingérer le même lot
+        with self._lock:
+            for path in sorted(self.folder.iterdir()):
+                # Fichiers temporaires d'Excel et fichiers cachés ignorés
+                if path.suffix not in ('.xlsx', '.csv') or path.name.startswith(('~$', '.')):
+                    continue
+                if path.name not in self.batches:
+                    added += self.ingest(read_batch(path), path.name)
+        return added
+
+    @property
+    def loaded(self):
+        """Vrai si le classeur est déjà en mémoire (toujours en mode local, à la demande en mode partagé)"""
+        return self.frames[0] is not None
+
+    def _main_frame(self):
+        if self.frames[0] is None:
+            self.frames[0] = read_survey(self.source)
+        return self.frames[0]
+
+    def data(self):
+        """Toutes les réponses (classeur et lots) dans un seul DataFrame"""
+        with self._lock:
+            self._main_frame()
+            if len(self.frames) > 1:
+                # Catégories différentes d'un lot à l'autre : la concaténation repasse en chaînes
+                self.frames = [compact_survey(pd.concat(self.frames, ignore_index=True), self.questions)]
+            return self.frames[0]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agrège un export en streaming et écrit le rapport précalculé")
+    parser.add_argument('source', nargs='?', default=DATA_PATH, help="export de l'enquête (.xlsx ou .csv)")
+    parser.add_argument('--taille-bloc', type=int, default=CHUNK_ROWS, help="lignes lues par bloc")
+    parser.add_argument('-o', '--sortie', help="fichier du rapport (par défaut <source>.rapport.json)")
+    parser.add_argument('-j', '--processus', type=int, default=1,
+                        help="processus pour le calcul des segments du rapport (0 : un par cœur)")
+    args = parser.parse_args(argv)
+
+    cube = stream_cube(args.source, chunksize=args.taille_bloc, maxsize=0)
+    report = build_report(cube, source={'path': str(args.source), 'sha256': file_digest(args.source)},
+                          jobs=args.processus or os.cpu_count())
+    sortie = args.sortie or report_path(args.source)
+    write_report(report, sortie)
+    print(f"{int(cube.sizes.sum())} répondants agrégés, {len(report['segments'])} segments écrits dans {sortie}")
+
+if __name__ == '__main__':
+    main()
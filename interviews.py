@@ -0,0 +1,265 @@
+"""Recherche plein texte dans les entretiens qualitatifs.
+
+Les entretiens sont lus depuis un fichier JSON externe (profil -> contexte,
+objectifs et réponses). Un index inversé positionnel, insensible à la casse
+et aux accents, est construit une fois et stocké à côté du corpus :
+
+    python interviews.py entretiens.json
+
+Requêtes : mots (tous requis), "expression exacte" entre guillemets,
+préfixes terminés par une étoile (reconver*).
+"""
+import argparse
+import bisect
+import functools
+import json
+import math
+import os
+import re
+import unicodedata
+from pathlib import Path
+
+from analytics import _write_atomic, file_digest
+
+INTERVIEWS_PATH = os.environ.get('DATACHALLENGE_INTERVIEWS', 'entretiens.json')
+
+# Thèmes repérés dans tout le corpus : une réponse est étiquetée dès qu'une des requêtes y trouve un résultat
+THEMES = {
+    'reconversion': ['reconver*', 'reprise', 'reprend*', 'quitte'],
+    'handicap': ['handicap*', 'fauteuil*', 'accessib*', 'inclusi*', 'amenag*'],
+    'télétravail': ['teletravail', 'distance', 'flexib*', 'nomade', 'presentiel'],
+    'international': ['internationa*', 'anglais', 'inde', 'indien', 'europe', 'etranger'],
+    'formation': ['formation*', 'former', 'forment', 'mentorat', '"monter en competences"', 'programme*'],
+    'écologie': ['dechet*', 'ecolo*', 'upcycling', 'circulaire', 'chute*', '"zero dechet"'],
+    'diversité': ['diversite', 'femme*', 'cliche*', 'garcon*', 'inclusi*'],
+    'image du luxe': ['elit*', 'reve', 'rigide', 'confidentiel', '"production en serie"', 'savoir'],
+}
+
+# Champs indexés de chaque profil, chacun comme un document à part ; les réponses de l'entretien
+# pèsent plus lourd dans le score que la fiche du profil
+FIELD_WEIGHTS = {'profil': 0.5, 'contexte': 0.5, 'objectifs': 0.5, 'interview': 1.0}
+
+# Version du format de l'index : à incrémenter quand THEMES, la normalisation ou la structure changent
+INDEX_FORMAT = 2
+
+TOKEN = re.compile(r'\w+')
+QUERY = re.compile(r'"([^"]+)"|(\S+)')
+
+# ---------------------------- NORMALISATION ----------------------------
+@functools.lru_cache(maxsize=None)
+def _fold_char(char):
+    base = [c for c in unicodedata.normalize('NFKD', char.lower()) if not unicodedata.combining(c)]
+    return base[0] if base else char
+
+def fold(text):
+    """Minuscules sans accents, caractère pour caractère : les positions restent celles du texte d'origine"""
+    return ''.join(_fold_char(c) for c in text)
+
+def stem(word):
+    """Racine grossière : le pluriel en -s / -x est retiré"""
+    return word[:-1] if len(word) > 3 and word[-1] in 'sx' else word
+
+def tokenize(text):
+    """Termes (racines sans accents) du texte, avec leurs positions de début et de fin"""
+    return [(stem(m.group()), m.start(), m.end()) for m in TOKEN.finditer(fold(text))]
+
+def parse_query(query):
+    """Requête découpée en expressions : listes de termes, un terme « préfixe* » restant seul"""
+    phrases = []
+    for quoted, word in QUERY.findall(query):
+        if word.endswith('*') and TOKEN.fullmatch(fold(word[:-1])):
+            phrases.append([fold(word[:-1]) + '*'])
+            continue
+        terms = [term for term, _, _ in tokenize(quoted or word)]
+        if terms:
+            phrases.append(terms)
+    return phrases
+
+# ---------------------------- CORPUS ----------------------------
+def load_corpus(path=INTERVIEWS_PATH):
+    """Profils des entretiens, dans l'ordre du fichier : {profil: {contexte, objectifs, interview}}"""
+    return json.loads(Path(path).read_text(encoding='utf-8'))
+
+def corpus_documents(corpus):
+    """Une entrée (profil, champ, numéro, texte) par champ de la fiche (nom du profil, contexte, objectifs)
+    et par réponse d'entretien"""
+    docs = []
+    for profil, data in corpus.items():
+        docs.append((profil, 'profil', 0, profil))
+        docs += [(profil, field, 0, data[field]) for field in ('contexte', 'objectifs') if data.get(field)]
+        docs += [(profil, 'interview', i, text) for i, text in enumerate(data['interview'])]
+    return docs
+
+def document_text(corpus, profil, field, i):
+    """Texte d'un document de l'index"""
+    if field == 'profil':
+        return profil
+    if field == 'interview':
+        return corpus[profil]['interview'][i]
+    return corpus[profil][field]
+
+def index_path(source):
+    return Path(source).with_suffix('.index.json')
+
+class InterviewIndex:
+    """Index inversé positionnel des réponses d'entretien, résultats classés par BM25"""
+
+    K1, B = 1.2, 0.75
+
+    def __init__(self, docs, lengths, postings, tags=None):
+        self.docs = docs          # [profil, champ, numéro de réponse] de chaque document
+        self.lengths = lengths    # nombre de termes de chaque document
+        self.postings = postings  # terme -> {document: [positions]}
+        self.vocabulary = sorted(postings)
+        self.avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+        self.tags = tags if tags is not None else self._tag(THEMES)  # thème -> documents
+
+    @classmethod
+    def build(cls, corpus):
+        docs, lengths, postings = [], [], {}
+        for doc, (profil, field, i, text) in enumerate(corpus_documents(corpus)):
+            docs.append([profil, field, i])
+            terms = tokenize(text)
+            lengths.append(len(terms))
+            for position, (term, _, _) in enumerate(terms):
+                postings.setdefault(term, {}).setdefault(doc, []).append(position)
+        return cls(docs, lengths, postings)
+
+    def to_dict(self):
+        return {
+            'docs': self.docs,
+            'lengths': self.lengths,
+            'postings': {term: [[doc, positions] for doc, positions in entries.items()]
+                         for term, entries in self.postings.items()},
+            'tags': self.tags,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        postings = {term: {doc: positions for doc, positions in entries}
+                    for term, entries in data['postings'].items()}
+        return cls(data['docs'], data['lengths'], postings, data['tags'])
+
+    @classmethod
+    def load(cls, path, digest=None):
+        """Charge l'index prébâti ; None s'il est absent ou construit sur une autre version du corpus"""
+        try:
+            data = json.loads(Path(path).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if data.get('format') != INDEX_FORMAT:
+            return None
+        if digest is not None and data.get('source', {}).get('sha256') != digest:
+            return None
+        return cls.from_dict(data)
+
+    def write(self, path, source=None):
+        data = {'format': INDEX_FORMAT, 'source': source or {}, **self.to_dict()}
+        _write_atomic(Path(path), lambda tmp: tmp.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8'))
+
+    def _term(self, term):
+        """Documents et positions d'un terme ; « préfixe* » réunit tous les termes du vocabulaire qui commencent ainsi"""
+        if not term.endswith('*'):
+            return self.postings.get(term, {})
+        prefix = term[:-1]
+        matches = {}
+        for word in self.vocabulary[bisect.bisect_left(self.vocabulary, prefix):]:
+            if not word.startswith(prefix):
+                break
+            for doc, positions in self.postings[word].items():
+                matches.setdefault(doc, []).extend(positions)
+        return {doc: sorted(positions) for doc, positions in matches.items()}
+
+    def _phrase(self, terms):
+        """Documents où les termes se suivent, avec la position de chaque terme de l'expression"""
+        lists = [self._term(term) for term in terms]
+        docs = set(lists[0]).intersection(*lists[1:]) if lists else set()
+        matches = {}
+        for doc in docs:
+            following = [set(entries[doc]) for entries in lists[1:]]
+            starts = [p for p in lists[0][doc] if all(p + k + 1 in s for k, s in enumerate(following))]
+            if starts:
+                matches[doc] = [p + k for p in starts for k in range(len(terms))]
+        return matches
+
+    def _tag(self, themes):
+        tags = {}
+        for theme, queries in themes.items():
+            docs = set()
+            for query in queries:
+                for terms in parse_query(query):
+                    docs.update(self._phrase(terms))
+            tags[theme] = sorted(docs)
+        return tags
+
+    def search(self, query, themes=(), limit=None):
+        """Réponses contenant toutes les expressions de la requête et tous les thèmes demandés, les plus pertinentes d'abord
+
+        Renvoie des tuples (document, score, positions des termes trouvés).
+        """
+        phrases = parse_query(query)
+        candidates = None
+        for theme in themes:
+            docs = set(self.tags.get(theme, ()))
+            candidates = docs if candidates is None else candidates & docs
+        scores, positions = {}, {}
+        for terms in phrases:
+            matches = self._phrase(terms)
+            docs = set(matches) if candidates is None else candidates & set(matches)
+            candidates = docs
+            idf = math.log(1 + (len(self.docs) - len(matches) + 0.5) / (len(matches) + 0.5))
+            for doc in docs:
+                tf = len(matches[doc]) / len(terms)
+                norm = self.K1 * (1 - self.B + self.B * self.lengths[doc] / (self.avg_length or 1))
+                weight = FIELD_WEIGHTS.get(self.docs[doc][1], 1.0)
+                scores[doc] = scores.get(doc, 0.0) + weight * idf * tf * (self.K1 + 1) / (tf + norm)
+                positions.setdefault(doc, []).extend(matches[doc])
+        if candidates is None:
+            return []
+        hits = [(doc, scores.get(doc, 0.0), sorted(set(positions.get(doc, ())))) for doc in candidates]
+        hits.sort(key=lambda hit: (-hit[1], hit[0]))
+        return hits[:limit] if limit else hits
+
+def snippet(text, positions, width=180):
+    """Extrait du texte autour des termes trouvés, mis en gras (Markdown)"""
+    spans = [(start, end) for i, (_, start, end) in enumerate(tokenize(text)) if i in set(positions)]
+    if not spans:
+        return text[:width] + ('…' if len(text) > width else '')
+    begin = max(0, spans[0][0] - width // 3)
+    stop = min(len(text), begin + width)
+    parts, cursor = [], begin
+    for start, end in spans:
+        if start < cursor or end > stop:
+            continue
+        parts += [text[cursor:start], f'**{text[start:end]}**']
+        cursor = end
+    parts.append(text[cursor:stop])
+    return ('…' if begin else '') + ''.join(parts) + ('…' if stop < len(text) else '')
+
+def open_corpus(path=INTERVIEWS_PATH):
+    """Corpus et index : l'index prébâti s'il correspond au fichier, sinon reconstruit et réécrit"""
+    corpus = load_corpus(path)
+    digest = file_digest(path)
+    index = InterviewIndex.load(index_path(path), digest)
+    if index is None:
+        index = InterviewIndex.build(corpus)
+        try:
+            index.write(index_path(path), {'path': str(path), 'sha256': digest})
+        except OSError:
+            # Répertoire en lecture seule : l'index reste en mémoire
+            pass
+    return corpus, index
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Construit l'index de recherche des entretiens")
+    parser.add_argument('corpus', nargs='?', default=INTERVIEWS_PATH, help="fichier JSON des entretiens")
+    parser.add_argument('-o', '--sortie', help="fichier de l'index (par défaut <corpus>.index.json)")
+    args = parser.parse_args(argv)
+
+    index = InterviewIndex.build(load_corpus(args.corpus))
+    sortie = args.sortie or index_path(args.corpus)
+    index.write(sortie, {'path': str(args.corpus), 'sha256': file_digest(args.corpus)})
+    print(f"{len(index.docs)} documents, {len(index.vocabulary)} termes indexés dans {sortie}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Chronométrage, section par section, d'une exécution du tableau de bord.
+
+Désactivé par défaut : on l'active depuis la barre latérale ou avec la
+variable d'environnement DATACHALLENGE_PROFILE=1. Chaque section terminée
+est aussi journalisée en JSON sur le logger « datachallenge.profiling ».
+"""
+import functools
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+ENV_VAR = 'DATACHALLENGE_PROFILE'
+
+logger = logging.getLogger('datachallenge.profiling')
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+def enabled_by_env():
+    return os.environ.get(ENV_VAR, '').strip().lower() in ('1', 'true', 'yes', 'oui')
+
+class RunProfiler:
+    """Temps passé dans chaque section nommée au cours d'une exécution du script"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        """Repart de zéro pour une nouvelle exécution"""
+        self.run_id = uuid.uuid4().hex[:8]
+        self.started = time.perf_counter()
+        self.timings = {}  # section -> [nombre d'appels, secondes cumulées]
+        self.finished = False  # summary() déjà journalisé
+
+    @contextmanager
+    def section(self, name):
+        """Chronomètre le bloc ; « parent/enfant » pour détailler une section"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            calls, total = self.timings.get(name, (0, 0.0))
+            self.timings[name] = [calls + 1, total + elapsed]
+            logger.info(json.dumps({'run': self.run_id, 'section': name, 'ms': round(elapsed * 1000, 3)},
+                                   ensure_ascii=False))
+
+    def timed(self, name):
+        """Décorateur : chaque appel de la fonction est chronométré comme une section"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.section(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def fragment(self, name, render=None):
+        """Décorateur des fragments Streamlit : chaque réexécution isolée est chronométrée comme une exécution à part
+
+        Au premier affichage, le fragment est compté dans l'exécution de la
+        page. Quand il se relance seul, l'exécution de la page est déjà
+        journalisée : le profileur repart de zéro, journalise cette
+        réexécution et passe son récapitulatif à render (affiché dans le
+        fragment, la barre latérale n'étant pas redessinée).
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                rerun = self.finished
+                if rerun:
+                    self.reset()
+                with self.section(name):
+                    result = func(*args, **kwargs)
+                if rerun and self.enabled:
+                    self.summary(fragment=name)
+                    if render is not None:
+                        render(self.table())
+                return result
+            return wrapper
+        return decorator
+
+    def table(self):
+        """Récapitulatif des sections : appels, durée cumulée et part du temps total de l'exécution"""
+        import pandas as pd  # importé ici : le module reste léger au démarrage du tableau de bord
+
+        wall = time.perf_counter() - self.started
+        rows = [
+            {'Section': name, 'Appels': calls, 'Durée (ms)': round(total * 1000, 1),
+             'Part (%)': round(100 * total / wall, 1) if wall else 0.0}
+            for name, (calls, total) in self.timings.items()
+        ]
+        return pd.DataFrame(rows, columns=['Section', 'Appels', 'Durée (ms)', 'Part (%)']).set_index('Section')
+
+    def summary(self, fragment=None):
+        """Journalise le total de l'exécution, une ligne JSON par exécution complète ou par réexécution d'un fragment"""
+        self.finished = True
+        if self.enabled:
+            logger.info(json.dumps({
+                'run': self.run_id,
+                **({'fragment': fragment} if fragment else {}),
+                'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+                'sections': {name: round(total * 1000, 3) for name, (_, total) in self.timings.items()},
+            }, ensure_ascii=False))
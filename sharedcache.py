@@ -0,0 +1,181 @@
+"""Cache partagé par tous les processus du tableau de bord sur un même hôte.
+
+Les répliques du serveur Streamlit pointent vers le même dossier
+(DATACHALLENGE_CACHE, par défaut .datachallenge_cache/ à côté du classeur ;
+« 0 » le désactive) :
+
+- l'index des répondants y est écrit une seule fois, en fichiers .npy que
+  chaque processus mappe en mémoire : une seule copie des bitmaps par hôte ;
+- les résultats calculés (cube, tables croisées, intervalles...) y sont rangés
+  sous une clé (empreinte des données, état des filtres). Un verrou de fichier
+  par clé garantit qu'un seul processus calcule, les autres relisent.
+"""
+import contextlib
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou, les écritures restent atomiques
+    fcntl = None
+
+from analytics import DATA_PATH, BitmapIndex, _write_atomic
+
+MAX_ENTRIES = 4096
+# Nombre de fichiers verrous : les clés sont réparties dessus
+LOCK_STRIPES = 64
+# Écritures d'un processus entre deux passes d'éviction
+EVICT_EVERY = 64
+# Index des répondants gardés dans le cache (un par état des données : classeur, puis chaque lot ajouté)
+MAX_INDEXES = 4
+
+def cache_dir(source=DATA_PATH):
+    """Dossier du cache partagé, ou None s'il est désactivé ou impossible à écrire"""
+    value = os.environ.get('DATACHALLENGE_CACHE', '').strip()
+    if value.lower() in ('0', 'false', 'no', 'non'):
+        return None
+    folder = Path(value) if value else Path(source).with_name('.datachallenge_cache')
+    try:
+        folder.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryFile(dir=folder):
+            pass
+    except OSError:
+        # Dépôt en lecture seule : les données sont servies sans cache partagé
+        return None
+    return folder
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Verrou exclusif entre processus, tenu le temps du bloc ; sans verrou si le fichier ne peut pas être créé"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handle = open(path, 'a')
+    except OSError:
+        yield
+        return
+    with handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+class ResultStore:
+    """Résultats picklés sur disque, indexés par clé ; les moins récemment lus sont évincés au-delà de max_entries
+
+    L'éviction parcourt tout le dossier : elle n'a lieu que toutes les
+    EVICT_EVERY écritures du processus, le dossier peut donc dépasser
+    brièvement max_entries.
+    """
+
+    def __init__(self, folder, max_entries=MAX_ENTRIES):
+        self.folder = Path(folder) / 'resultats'
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._writes = 0
+
+    def _digest(self, key):
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+    def _path(self, digest):
+        return self.folder / f'{digest}.pkl'
+
+    def _lock(self, digest):
+        return file_lock(self.folder / 'verrous' / f'{int(digest[:8], 16) % LOCK_STRIPES}.lock')
+
+    def get(self, key, default=None):
+        path = self._path(self._digest(key))
+        try:
+            with open(path, 'rb') as handle:
+                value = pickle.load(handle)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return default
+        # Date d'accès mise à jour pour l'éviction
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return value
+
+    def put(self, key, value):
+        path = self._path(self._digest(key))
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            _write_atomic(path, lambda tmp: tmp.write_bytes(data))
+        except OSError:
+            # Disque plein ou dossier en lecture seule : le résultat n'est simplement pas partagé
+            return
+        self._writes += 1
+        if self._writes % EVICT_EVERY == 0:
+            self._evict()
+
+    def get_or_compute(self, key, compute):
+        """Résultat de la clé ; s'il manque, un seul processus le calcule pendant que les autres attendent"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        digest = self._digest(key)
+        with self._lock(digest):
+            value = self.get(key, missing)
+            if value is missing:
+                value = compute()
+                self.put(key, value)
+        return value
+
+    def _evict(self):
+        entries = []
+        with os.scandir(self.folder) as scan:
+            for entry in scan:
+                if not entry.name.endswith('.pkl'):
+                    continue
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    # Entrée supprimée entre-temps par un autre processus
+                    continue
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+
+def shared_index(build, digest, folder):
+    """Index des répondants mappé depuis le cache partagé, construit par le premier processus qui en a besoin
+
+    build() (qui renvoie un BitmapIndex) n'est appelé que si l'index n'a pas
+    encore été écrit pour cette empreinte des données.
+    """
+    index_dir = Path(folder) / f'index-{digest[:16]}'
+    if not (index_dir / 'index.json').exists():
+        with file_lock(Path(folder) / 'index.lock'):
+            if not (index_dir / 'index.json').exists():
+                build().save(index_dir)
+                evict_indexes(folder, keep=index_dir)
+    # Date d'accès mise à jour pour l'éviction
+    with contextlib.suppress(OSError):
+        os.utime(index_dir / 'index.json')
+    return BitmapIndex.load(index_dir)
+
+def evict_indexes(folder, max_indexes=MAX_INDEXES, keep=None):
+    """Supprime les index les moins récemment chargés au-delà de max_indexes
+
+    Un processus qui a déjà chargé un index supprimé garde ses tableaux
+    mappés (le système ne libère les fichiers qu'à la fermeture du mapping).
+    """
+    entries = []
+    for index_dir in Path(folder).glob('index-*'):
+        try:
+            entries.append((os.stat(index_dir / 'index.json').st_mtime, index_dir))
+        except OSError:
+            # Index incomplet ou supprimé entre-temps par un autre processus
+            continue
+    entries.sort()
+    for _, index_dir in entries[:max(0, len(entries) - max_indexes)]:
+        if index_dir != keep:
+            shutil.rmtree(index_dir, ignore_errors=True)
@@ -0,0 +1,111 @@
+"""Instantané de la page d'accueil, précalculé au déploiement.
+
+Nombre de répondants, effectifs par filière et par niveau d'études, et les
+deux graphiques de répartition déjà sérialisés : un processus qui démarre
+affiche l'aperçu sans importer pandas ni lire le classeur.
+
+    python snapshot.py Data_challenge.xlsx
+
+Ce module n'importe que la bibliothèque standard ; les dépendances lourdes
+ne sont chargées que pour construire l'instantané.
+"""
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+
+DATA_PATH = os.environ.get('DATACHALLENGE_DATA', 'Data_challenge.xlsx')
+
+def snapshot_path(source):
+    return Path(source).with_suffix('.apercu.json')
+
+def _source_info(source):
+    stat = Path(source).stat()
+    h = hashlib.sha256()
+    with open(source, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return {'path': str(source), 'sha256': h.hexdigest(), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+def filiere_figure(filieres):
+    """Camembert des effectifs par filière ({libellé: effectif})"""
+    import plotly.express as px
+
+    return px.pie(names=list(filieres), values=list(filieres.values()),
+                  title='Répartition par filière',
+                  color_discrete_sequence=px.colors.qualitative.Pastel)
+
+def niveau_figure(niveaux):
+    """Histogramme des effectifs par niveau d'études ({libellé: effectif})"""
+    import plotly.express as px
+
+    fig = px.bar(x=list(niveaux), y=list(niveaux.values()),
+                 title='Répartition par niveau d\'études',
+                 labels={'x': "Niveau d'études", 'y': 'count'},
+                 color_discrete_sequence=['#2A9D8F'])
+    fig.update_layout(bargap=0)
+    return fig
+
+def overview_counts(cube):
+    """Effectifs par filière et par niveau d'études : marges du cube, sans la case « non renseigné »"""
+    filieres = dict(zip(cube.labels['Filière'], cube.sizes.sum(axis=1)[:-1].tolist()))
+    niveaux = dict(zip(cube.labels["Niveau d'études"], cube.sizes.sum(axis=0)[:-1].tolist()))
+    return filieres, niveaux
+
+def build_snapshot(cube, source):
+    """Contenu de l'instantané pour les marges du cube (sans la case « non renseigné »)"""
+    filieres, niveaux = overview_counts(cube)
+    return {
+        'source': _source_info(source),
+        'total': int(cube.sizes.sum()),
+        'filieres': filieres,
+        'niveaux': niveaux,
+        'figures': [filiere_figure(filieres).to_plotly_json(), niveau_figure(niveaux).to_plotly_json()],
+    }
+
+def load_snapshot(source=DATA_PATH):
+    """Instantané du classeur, ou None s'il est absent ou ne correspond plus au fichier"""
+    try:
+        data = json.loads(snapshot_path(source).read_text(encoding='utf-8'))
+        stat = Path(source).stat()
+    except (OSError, ValueError):
+        return None
+    info = data.get('source', {})
+    if info.get('mtime_ns') == stat.st_mtime_ns and info.get('size') == stat.st_size:
+        return data
+    # Fichier touché (copie au déploiement...) : on ne l'écarte que si le contenu a changé
+    current = _source_info(source)
+    if info.get('sha256') != current['sha256']:
+        return None
+    # Même contenu : date et taille mises à jour pour ne pas re-hacher le classeur à chaque démarrage
+    data['source'] = {**info, 'mtime_ns': current['mtime_ns'], 'size': current['size']}
+    path = snapshot_path(source)
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    finally:
+        tmp.unlink(missing_ok=True)
+    return data
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Précalcule l'instantané de la page d'accueil")
+    parser.add_argument('classeur', nargs='?', default=DATA_PATH, help="fichier Excel de l'enquête")
+    parser.add_argument('-o', '--sortie', help="fichier de l'instantané (par défaut <classeur>.apercu.json)")
+    args = parser.parse_args(argv)
+
+    from plotly.utils import PlotlyJSONEncoder
+    from analytics import AggregateCube, BitmapIndex, _write_atomic, read_survey
+
+    cube = AggregateCube.from_index(BitmapIndex(read_survey(args.classeur)), maxsize=0)
+    data = build_snapshot(cube, args.classeur)
+    sortie = Path(args.sortie or snapshot_path(args.classeur))
+    text = json.dumps(data, cls=PlotlyJSONEncoder, ensure_ascii=False)
+    _write_atomic(sortie, lambda tmp: tmp.write_text(text, encoding='utf-8'))
+    print(f"Instantané de {data['total']} répondants écrit dans {sortie}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Génération de réponses synthétiques conformes au questionnaire.
+
+Sert aux tests de montée en charge (voir benchmark.py) :
+
+    python synthetic.py 1000000 -o synthetique.arrow
+"""
+import argparse
+from pathlib import Path
+
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from analytics import questions
+
+MAX_PICKS = 3
+
+def _single_choice(rng, options, n):
+    # Poids tirés au hasard pour que les réponses ne soient pas uniformes
+    weights = rng.dirichlet(np.ones(len(options)))
+    return pd.Categorical.from_codes(rng.choice(len(options), size=n, p=weights), categories=options)
+
+def _multi_choice(rng, options, n, max_picks=MAX_PICKS):
+    """Réponses « A / B / C » de 1 à max_picks options distinctes, encodées en catégories"""
+    m = len(options)
+    n_picks = rng.integers(1, min(max_picks, m) + 1, size=n)
+    # Les max_picks plus petites clés aléatoires donnent un tirage sans remise par ligne
+    picks = np.argsort(rng.random((n, m)), axis=1)[:, :max_picks]
+    picks = np.where(np.arange(picks.shape[1]) < n_picks[:, None], picks, -1)
+    # Une combinaison ordonnée de choix = un entier, puis une chaîne par combinaison rencontrée
+    combo = np.zeros(n, dtype=np.int64)
+    for j in range(picks.shape[1]):
+        combo = combo * (m + 1) + picks[:, j] + 1
+    uniques, codes = np.unique(combo, return_inverse=True)
+    labels = []
+    for value in uniques:
+        chosen = []
+        for _ in range(picks.shape[1]):
+            value, pick = divmod(int(value), m + 1)
+            if pick:
+                chosen.append(options[pick - 1])
+        labels.append(' / '.join(reversed(chosen)))
+    return pd.Categorical.from_codes(codes, categories=labels)
+
+def generate_survey(n, questions=questions, seed=0, max_picks=MAX_PICKS):
+    """DataFrame de n répondants, une colonne catégorielle par question du questionnaire"""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for q in questions.values():
+        if q.get('multiple'):
+            data[q['colonne']] = _multi_choice(rng, q['options'], n, max_picks)
+        else:
+            data[q['colonne']] = _single_choice(rng, q['options'], n)
+    return pd.DataFrame(data)
+
+def write_survey(df, path):
+    """Écrit les réponses au format déduit de l'extension (.xlsx, .csv, .parquet ou .arrow)"""
+    path = Path(path)
+    if path.suffix == '.xlsx':
+        df.to_excel(path, index=False)
+    elif path.suffix == '.csv':
+        df.to_csv(path, index=False)
+    elif path.suffix == '.parquet':
+        df.to_parquet(path, index=False)
+    elif path.suffix == '.arrow':
+        feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), path, compression='uncompressed')
+    else:
+        raise ValueError(f"Format non supporté : {path.suffix}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère des réponses synthétiques au questionnaire")
+    parser.add_argument('taille', type=int, help="nombre de répondants")
+    parser.add_argument('-o', '--sortie', default='synthetique.arrow', help="fichier de sortie (.xlsx, .csv, .parquet, .arrow)")
+    parser.add_argument('--graine', type=int, default=0, help="graine du générateur aléatoire")
+    args = parser.parse_args(argv)
+
+    write_survey(generate_survey(args.taille, seed=args.graine), args.sortie)
+    print(f"{args.taille} répondants écrits dans {args.sortie}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""Tests de non-régression du cœur analytique : python -m pytest -q"""
+import io
+import os
+
+import pandas as pd
+import numpy as np
+import openpyxl
+import pyarrow.parquet as pq
+
+import snapshot
+from analytics import AggregateCube, BitmapIndex, bootstrap_interval, percentage_interval, questions
+from export import export_file, frame_chunks, results_table
+from ingestion import SurveyStore, stream_cube
+from sharedcache import shared_index
+from synthetic import generate_survey
+from waves import WaveStore
+
+def small_cube():
+    df = pd.DataFrame({
+        'Filière': ['Ingénierie', 'Ingénierie', 'Autre'],
+        "Niveau d'études": ['Bac +3', 'Bac +5 et plus', 'Bac +5 et plus'],
+        'Niveau de connaissance': ['Très bon', 'Faible', 'Moyen'],
+        'Motivations': ['Salaire / Évolution', 'Rien', 'Salaire'],
+    })
+    return AggregateCube.from_index(BitmapIndex(df))
+
+def survey_with_new_answers(n=203):
+    """Réponses synthétiques dont les dernières lignes apportent des libellés hors questionnaire"""
+    df = generate_survey(n).astype(object)
+    df.loc[150:, 'Filière'] = 'Design'
+    df.loc[170:, 'Niveau de connaissance'] = 'Expert'
+    # Libellés hors questionnaire apparus dans un ordre non alphabétique
+    df.loc[180:, 'Motivations'] = 'Salaire / Télétravail'
+    df.loc[198:, 'Motivations'] = 'Primes'
+    df.loc[190:195, 'Raisons de ne pas postuler'] = None
+    return df
+
+def by_label(index, col):
+    """Matrice indicatrice d'une question, colonnes triées par libellé (l'ordre du vocabulaire peut différer)"""
+    return pd.DataFrame(np.asarray(index.indicator(col)), columns=index.labels[col]).sort_index(axis=1)
+
+def cube_by_label(cube, col):
+    return cube.cross_counts('Filière', col).sort_index().sort_index(axis=1)
+
+def test_append_in_pieces_matches_rebuild(tmp_path):
+    df = survey_with_new_answers()
+    full = BitmapIndex(df)
+    # Découpes à cheval sur les octets des bitmaps : 8, 13, 64, 65 puis le reste
+    bounds = [8, 13, 64, 65, len(df)]
+    index = BitmapIndex(df.iloc[:bounds[0]])
+    cube = AggregateCube.from_index(index)
+    for start, stop in zip(bounds, bounds[1:]):
+        if start == 64:
+            # Index relu depuis le disque : bitmaps mappés en lecture seule
+            index.save(tmp_path / 'index')
+            index = BitmapIndex.load(tmp_path / 'index')
+            cube = AggregateCube(cube.labels, cube.sizes, cube.counts, index)
+        index = index.append(df.iloc[start:stop])
+        cube = cube.extend(index, start)
+    rebuilt = AggregateCube.from_index(full)
+    assert index.n_rows == full.n_rows
+    for col in full.labels:
+        pd.testing.assert_frame_equal(by_label(index, col), by_label(full, col), check_dtype=False)
+        pd.testing.assert_frame_equal(cube_by_label(cube, col), cube_by_label(rebuilt, col))
+    assert cube.size() == rebuilt.size() == len(df)
+
+def test_stream_cube_matches_index(tmp_path):
+    df = survey_with_new_answers()
+    df.to_csv(tmp_path / 'export.csv', index=False)
+    indexed = AggregateCube.from_index(BitmapIndex(pd.read_csv(tmp_path / 'export.csv')))
+    streamed = stream_cube(tmp_path / 'export.csv', chunksize=37)
+    assert streamed.labels == indexed.labels
+    assert (streamed.sizes == indexed.sizes).all()
+    for col in indexed.counts:
+        assert (streamed.counts[col] == indexed.counts[col]).all(), col
+    for q in questions.values():
+        col = q['colonne']
+        pd.testing.assert_frame_equal(streamed.cross_tab('Filière', col), indexed.cross_tab('Filière', col))
+
+def test_bootstrap_interval_empty_counts():
+    low, high = bootstrap_interval(np.zeros(0, dtype=np.int64))
+    assert low.shape == high.shape == (0,)
+    low, high = bootstrap_interval(np.array([[0, 0], [1, 3]]))
+    assert np.isnan(low[0]).all() and np.isnan(high[0]).all()
+    assert not np.isnan(low[1]).any()
+
+def test_empty_segment():
+    # Aucun répondant « Autre » en Bac +3
+    cube = small_cube()
+    state = (('Autre',), ('Bac +3',), (), 'and')
+    assert cube.size(*state[:2]) == 0
+    assert percentage_interval(cube.distribution('Niveau de connaissance', *state[:2])).empty
+    low, high = cube.cross_tab_interval('Filière', 'Motivations', *state)
+    assert low.empty and high.empty
+    assert results_table(cube, state).empty
+
+def test_export_without_rows():
+    df = pd.DataFrame({'Filière': pd.Categorical(['Autre']), 'Motivations': ['Salaire']})
+    mask = np.zeros(len(df), dtype=bool)
+    with export_file(frame_chunks(df, mask), 'CSV') as out:
+        assert out.read().decode('utf-8').strip() == 'Filière,Motivations'
+    with export_file(frame_chunks(df, mask), 'Parquet') as out:
+        table = pq.read_table(io.BytesIO(out.read()))
+        assert table.num_rows == 0 and table.column_names == ['Filière', 'Motivations']
+    with export_file(frame_chunks(df, mask), 'XLSX') as out:
+        sheet = openpyxl.load_workbook(io.BytesIO(out.read())).active
+        assert [c.value for c in sheet[1]] == ['Filière', 'Motivations'] and sheet.max_row == 1
+
+def test_parquet_export_schema_from_whole_frame():
+    # Colonne libre vide dans tout le premier bloc, renseignée ensuite
+    df = pd.DataFrame({'Filière': ['Autre'] * 5,
+                       'Commentaire': pd.Series([None, None, None, 'Très bien', None], dtype=object)})
+    with export_file(frame_chunks(df, chunksize=2), 'Parquet') as out:
+        table = pq.read_table(io.BytesIO(out.read()))
+    assert table.column('Commentaire').to_pylist() == [None, None, None, 'Très bien', None]
+
+def test_waves_empty_segment_and_reingest(tmp_path):
+    df = pd.DataFrame({
+        'Q1': ['Ingénierie', 'Ingénierie', 'Autre'],
+        'Q2': ['Bac +3', 'Bac +5 et plus', 'Bac +5 et plus'],
+        'Q4': ['Très bon', 'Faible', 'Moyen'],
+    })
+    df.to_csv(tmp_path / 'a.csv', index=False)
+    df.head(2).to_csv(tmp_path / 'b.csv', index=False)
+    store = WaveStore(tmp_path / 'vagues')
+    store.add('2025', tmp_path / 'a.csv')
+    store.add('2026', tmp_path / 'a.csv')
+    assert store.evolution('Filière', '2025', '2026', ('Autre',), ('Bac +3',)).empty
+    assert store.comparison_table('2025', '2026', ('Autre',), ('Bac +3',)).empty
+    assert store.cube('2026').size() == 3
+    # Partition remplacée par un autre processus : le cube en mémoire est relu
+    WaveStore(tmp_path / 'vagues').add('2026', tmp_path / 'b.csv')
+    assert store.cube('2026').size() == 2
+
+def test_shared_key_follows_batch_content(tmp_path):
+    generate_survey(40).to_excel(tmp_path / 'survey.xlsx', index=False)
+    first = SurveyStore(tmp_path / 'survey.xlsx', shared=tmp_path / 'cache')
+    second = SurveyStore(tmp_path / 'survey.xlsx', shared=tmp_path / 'cache')
+    assert first.key == second.key
+    # Lots de même nom mais de contenus différents : ni l'index ni le cube ne sont partagés
+    first.ingest(generate_survey(10, seed=1), 'lot.csv')
+    second.ingest(generate_survey(12, seed=2), 'lot.csv')
+    assert first.key != second.key
+    assert first.state[1].size() == 50 and second.state[1].size() == 52
+
+def test_shared_indexes_evicted(tmp_path):
+    df = generate_survey(20)
+    for i in range(4):
+        shared_index(lambda: BitmapIndex(df), f'{i:016x}', tmp_path)
+        os.utime(tmp_path / f'index-{i:016x}' / 'index.json', (i, i))
+    # Index le plus ancien relu : c'est le suivant qui part quand un cinquième est construit
+    index = shared_index(lambda: BitmapIndex(df), f'{0:016x}', tmp_path)
+    shared_index(lambda: BitmapIndex(df), f'{4:016x}', tmp_path)
+    assert sorted(p.name[-1] for p in tmp_path.glob('index-*')) == ['0', '2', '3', '4']
+    assert index.n_rows == 20
+
+def test_snapshot_touched_source_refreshed(tmp_path, monkeypatch):
+    source = tmp_path / 'survey.xlsx'
+    generate_survey(30).to_excel(source, index=False)
+    snapshot.main([str(source)])
+    os.utime(source, ns=(0, 0))
+    hashed = []
+    source_info = snapshot._source_info
+    monkeypatch.setattr(snapshot, '_source_info', lambda s: hashed.append(s) or source_info(s))
+    # Contenu inchangé : l'instantané reste valable et sa date est mise à jour, une seule fois
+    assert snapshot.load_snapshot(source)['total'] == 30
+    assert snapshot.load_snapshot(source)['source']['mtime_ns'] == 0
+    assert len(hashed) == 1
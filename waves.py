@@ -0,0 +1,302 @@
+"""Enquête reconduite chaque année : une partition par vague, au schéma du questionnaire.
+
+Chaque vague est ingérée depuis son export (.xlsx ou .csv), quels que soient
+les noms de ses colonnes : elles sont rapportées aux colonnes de `questions`
+par leur libellé, par le code de la question (« Q4 », schéma du script
+secondaire) ou par les "alias" de la spécification. La partition d'une vague
+(dossier vagues/<vague>/) contient ses réponses normalisées (Arrow) et son
+index des répondants ; une comparaison ne lit que les partitions des vagues
+demandées.
+
+    python waves.py ajouter 2025 Data_challenge.xlsx
+    python waves.py ajouter 2026 donnees_sondage.xlsx
+    python waves.py comparer 2025 2026 -o evolution.csv
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from analytics import (
+    DATA_PATH, AggregateCube, BitmapIndex, _write_atomic, compact_survey, difference_interval, file_digest,
+    ordered_labels, questions, themes,
+)
+
+WAVE_NAME = re.compile(r'\w[\w.-]*')
+
+def waves_dir(source=DATA_PATH):
+    """Dossier des partitions par vague (DATACHALLENGE_WAVES pour le déplacer)"""
+    return Path(os.environ.get('DATACHALLENGE_WAVES') or Path(source).with_name('vagues'))
+
+# ---------------------------- SCHÉMA ----------------------------
+def question_code(key):
+    """Code court d'une question : « Q4 » pour « Q4 - Connaissance métiers »"""
+    return key.split(' - ', 1)[0].strip()
+
+def _normalize_name(name):
+    return ' '.join(str(name).split()).casefold()
+
+def column_mapping(columns, questions=questions):
+    """{colonne de l'export: colonne du questionnaire} ; les colonnes non reconnues sont absentes"""
+    names = {}
+    for key, q in questions.items():
+        for name in [q['colonne'], key, question_code(key), *q.get('alias', [])]:
+            names.setdefault(_normalize_name(name), q['colonne'])
+    mapping = {}
+    for column in columns:
+        target = names.get(_normalize_name(column))
+        if target is None:
+            continue
+        if target in mapping.values():
+            raise ValueError(f"Plusieurs colonnes de l'export correspondent à « {target} »")
+        mapping[column] = target
+    return mapping
+
+def read_export(path):
+    """Export brut d'une vague, colonnes d'origine"""
+    path = Path(path)
+    if path.suffix == '.csv':
+        return pd.read_csv(path)
+    if path.suffix in ('.xlsx', '.xlsm'):
+        return pd.read_excel(path)
+    raise ValueError(f"Format non supporté : {path.suffix}")
+
+def normalize_wave(df, questions=questions):
+    """Réponses d'une vague renommées selon le questionnaire et compactées ; les autres colonnes sont écartées
+
+    Renvoie aussi la correspondance des colonnes retenue.
+    """
+    mapping = column_mapping(df.columns, questions)
+    missing = [col for col in AggregateCube.AXES if col not in mapping.values()]
+    if missing:
+        raise ValueError(f"Colonnes indispensables absentes de l'export : {', '.join(missing)}")
+    order = [q['colonne'] for q in questions.values() if q['colonne'] in mapping.values()]
+    df = df[list(mapping)].rename(columns=mapping)[order]
+    return compact_survey(df, questions), mapping
+
+# ---------------------------- PARTITIONS ----------------------------
+class WaveStore:
+    """Vagues de l'enquête, une partition chacune ; cubes et index chargés à la première demande"""
+
+    def __init__(self, folder=None, questions=questions):
+        self.folder = Path(folder) if folder else waves_dir()
+        self.questions = questions
+        self._spec = {q['colonne']: q for q in questions.values()}
+        self._cubes = {}  # vague -> (version de la partition, cube), une fois lue
+
+    def waves(self):
+        """Vagues disponibles, par ordre de nom"""
+        if not self.folder.is_dir():
+            return []
+        return sorted(path.name for path in self.folder.iterdir() if (path / 'vague.json').exists())
+
+    def info(self, wave):
+        """Métadonnées d'une vague : source, nombre de répondants, correspondance des colonnes"""
+        try:
+            return json.loads((self.folder / wave / 'vague.json').read_text(encoding='utf-8'))
+        except OSError:
+            raise KeyError(f"Vague inconnue : {wave}") from None
+
+    def add(self, wave, source):
+        """Ingère (ou remplace) la partition d'une vague depuis son export ; renvoie le nombre de répondants"""
+        if not WAVE_NAME.fullmatch(wave):
+            raise ValueError(f"Nom de vague invalide : {wave}")
+        df, mapping = normalize_wave(read_export(source), self.questions)
+        target = self.folder / wave
+        tmp = self.folder / f'.{wave}.{os.getpid()}.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            feather.write_feather(table, tmp / 'reponses.arrow', compression='uncompressed')
+            BitmapIndex(df, self.questions).save(tmp / 'index')
+            meta = {
+                'vague': wave,
+                'source': {'path': str(source), 'sha256': file_digest(source)},
+                'n_rows': len(df),
+                'colonnes': mapping,
+            }
+            # Métadonnées écrites en dernier : leur présence signale une partition complète
+            _write_atomic(tmp / 'vague.json',
+                          lambda path: path.write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8'))
+            # Remplacement par renommages : une lecture en cours garde l'ancienne partition complète
+            old = self.folder / f'.{wave}.{os.getpid()}.old'
+            if target.exists():
+                os.replace(target, old)
+            os.replace(tmp, target)
+            shutil.rmtree(old, ignore_errors=True)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self._cubes.pop(wave, None)
+        return len(df)
+
+    def version(self, wave):
+        """Version de la partition d'une vague : change chaque fois qu'elle est réingérée"""
+        try:
+            stat = (self.folder / wave / 'vague.json').stat()
+        except OSError:
+            raise KeyError(f"Vague inconnue : {wave}") from None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def cube(self, wave):
+        """Cube d'une vague, sur son index mappé en mémoire : seule cette partition est lue
+
+        Relu si la partition a été remplacée depuis (python waves.py ajouter).
+        """
+        version = self.version(wave)
+        cached = self._cubes.get(wave)
+        if cached is None or cached[0] != version:
+            cached = (version, AggregateCube.from_index(BitmapIndex.load(self.folder / wave / 'index')))
+            self._cubes[wave] = cached
+        return cached[1]
+
+    def data(self, wave):
+        """Réponses normalisées d'une vague"""
+        return feather.read_table(self.folder / wave / 'reponses.arrow', memory_map=True).to_pandas()
+
+    # ---------------------------- COMPARAISONS ----------------------------
+    def mentions(self, wave, col, filiere=(), niveau=(), criteria=(), how='and'):
+        """Mentions de chaque réponse d'une question dans une vague, pour un état des filtres"""
+        cube = self.cube(wave)
+        if col not in cube.labels:
+            return pd.Series(dtype=np.int64)
+        if not criteria:
+            return cube.distribution(col, filiere, niveau)
+        index = cube.index
+        bitmap = index.query({'Filière': filiere, "Niveau d'études": niveau})
+        # Une question absente de la vague ne peut pas filtrer ses répondants
+        bitmap &= index.query({c: answers for c, answers in criteria if c in index.labels}, how)
+        return index.counts(col, index.mask(bitmap))
+
+    def _labels(self, col, seen):
+        return ordered_labels(self._spec[col], list(seen)) if col in self._spec else list(seen)
+
+    def _counts(self, col, waves, state):
+        """Mentions (réponses x vagues), réponses alignées et ordonnées comme le questionnaire"""
+        table = pd.DataFrame({wave: self.mentions(wave, col, *state) for wave in waves}).fillna(0).astype(np.int64)
+        table = table[table.sum(axis=1) > 0]
+        return table.reindex(self._labels(col, table.index))
+
+    def compare(self, col, waves, filiere=(), niveau=(), criteria=(), how='and'):
+        """Part (en %) de chaque réponse d'une question, une colonne par vague"""
+        counts = self._counts(col, waves, (filiere, niveau, criteria, how))
+        # Vague sans mention dans le segment : colonne vide plutôt que des zéros
+        return counts.div(counts.sum().replace(0, np.nan)).mul(100).round(1)
+
+    def evolution(self, col, before, after, filiere=(), niveau=(), criteria=(), how='and'):
+        """Parts dans deux vagues, écart en points et son intervalle de confiance à 95 %"""
+        counts = self._counts(col, [before, after], (filiere, niveau, criteria, how))
+        columns = [before, after, 'Écart (pts)', 'IC 95 % bas', 'IC 95 % haut']
+        if counts.empty:
+            # Aucune mention dans les deux vagues pour ce segment
+            return pd.DataFrame(columns=columns, dtype=float)
+        shares = counts.div(counts.sum().replace(0, np.nan)).mul(100)
+        low, high = difference_interval(counts[before].to_numpy(), counts[after].to_numpy())
+        table = shares.assign(**{'Écart (pts)': shares[after] - shares[before], 'IC 95 % bas': low,
+                                 'IC 95 % haut': high})
+        if shares.isna().any(axis=None):
+            table[['Écart (pts)', 'IC 95 % bas', 'IC 95 % haut']] = np.nan
+        return table.round(1)
+
+    def _cross_counts(self, wave, col_x, col_y, state):
+        cube = self.cube(wave)
+        if col_x not in cube.labels or col_y not in cube.labels:
+            return pd.DataFrame(dtype=np.int64)
+        return cube.cross_counts(col_x, col_y, *state)
+
+    def compare_cross_tab(self, col_x, col_y, waves, filiere=(), niveau=(), criteria=(), how='and'):
+        """Tables croisées (en % par ligne) de chaque vague, empilées sous un niveau d'index « Vague »"""
+        state = (tuple(filiere), tuple(niveau), tuple(criteria), how)
+        tables = {wave: self.cube(wave).cross_tab(col_x, col_y, *state) for wave in waves
+                  if not self._cross_counts(wave, col_x, col_y, state).empty}
+        if not tables:
+            return pd.DataFrame()
+        table = pd.concat(tables, names=['Vague'])
+        return table[self._labels(col_y, table.columns)].fillna(0.0)
+
+    def cross_tab_evolution(self, col_x, col_y, before, after, filiere=(), niveau=(), criteria=(), how='and'):
+        """Écart (en points) de chaque case de la table croisée entre deux vagues, avec ses bornes basse et haute
+
+        Une ligne absente de l'une des deux vagues reste vide.
+        """
+        state = (tuple(filiere), tuple(niveau), tuple(criteria), how)
+        a, b = (self._cross_counts(wave, col_x, col_y, state) for wave in (before, after))
+        rows = self._labels(col_x, a.index.union(b.index, sort=False))
+        cols = self._labels(col_y, a.columns.union(b.columns, sort=False))
+        a, b = (t.reindex(index=rows, columns=cols, fill_value=0) for t in (a, b))
+        a.index.name, a.columns.name = col_x, col_y
+        counts_a, counts_b = a.to_numpy(), b.to_numpy()
+        shares_a = counts_a / np.maximum(counts_a.sum(axis=1, keepdims=True), 1) * 100
+        shares_b = counts_b / np.maximum(counts_b.sum(axis=1, keepdims=True), 1) * 100
+        low, high = difference_interval(counts_a, counts_b)
+        empty = ((counts_a.sum(axis=1) == 0) | (counts_b.sum(axis=1) == 0))[:, None]
+        return tuple(pd.DataFrame(np.where(empty, np.nan, values), index=a.index, columns=a.columns)
+                     for values in (shares_b - shares_a, low, high))
+
+    def comparison_table(self, before, after, filiere=(), niveau=(), criteria=(), how='and', themes=themes):
+        """Évolution de chaque question et de chaque table croisée des thèmes entre deux vagues, en format long"""
+        state = (tuple(filiere), tuple(niveau), tuple(criteria), how)
+        rows = []
+        for key, q in self.questions.items():
+            table = self.evolution(q['colonne'], before, after, *state)
+            for answer, values in table.iterrows():
+                rows.append([key, '', answer, *values.tolist()])
+        for theme, tables in themes.items():
+            for col_x, col_y, title in tables:
+                diff, low, high = self.cross_tab_evolution(col_x, col_y, before, after, *state)
+                shares = self.compare_cross_tab(col_x, col_y, [before, after], *state)
+                for row in diff.index:
+                    for answer in diff.columns:
+                        values = [shares[answer].get((wave, row), np.nan) if answer in shares else np.nan
+                                  for wave in (before, after)]
+                        rows.append([f'{theme} - {title}', row, answer, *np.round(values, 1).tolist(),
+                                     round(diff.at[row, answer], 1), round(low.at[row, answer], 1),
+                                     round(high.at[row, answer], 1)])
+        return pd.DataFrame(rows, columns=['Tableau', 'Ligne', 'Réponse', before, after, 'Écart (pts)',
+                                           'IC 95 % bas', 'IC 95 % haut'])
+
+# ---------------------------- LIGNE DE COMMANDE ----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vagues successives de l'enquête : ingestion et comparaison")
+    parser.add_argument('--dossier', help="dossier des partitions (par défaut vagues/ à côté du classeur)")
+    parser.add_argument('--questions', help="spécification JSON des questions (par défaut celle de analytics.py)")
+    commands = parser.add_subparsers(dest='commande', required=True)
+    add = commands.add_parser('ajouter', help="ingère l'export d'une vague (remplace la partition existante)")
+    add.add_argument('vague', help="nom de la vague, par exemple 2026")
+    add.add_argument('export', help="export de la vague (.xlsx ou .csv)")
+    compare = commands.add_parser('comparer', help="évolution de chaque question et table croisée entre deux vagues")
+    compare.add_argument('avant', help="vague de référence")
+    compare.add_argument('apres', help="vague comparée")
+    compare.add_argument('-o', '--sortie', help="fichier CSV du tableau (par défaut affiché)")
+    commands.add_parser('lister', help="vagues disponibles")
+    args = parser.parse_args(argv)
+
+    spec = questions
+    if args.questions:
+        spec = json.loads(Path(args.questions).read_text(encoding='utf-8'))
+    store = WaveStore(args.dossier, spec)
+    if args.commande == 'ajouter':
+        n = store.add(args.vague, args.export)
+        mapping = store.info(args.vague)['colonnes']
+        print(f"Vague {args.vague} : {n} répondants, {len(mapping)} questions reconnues dans {store.folder / args.vague}")
+    elif args.commande == 'lister':
+        for wave in store.waves():
+            info = store.info(wave)
+            print(f"{wave}\t{info['n_rows']} répondants\t{info['source']['path']}")
+    else:
+        table = store.comparison_table(args.avant, args.apres)
+        if args.sortie:
+            table.to_csv(args.sortie, index=False)
+            print(f"{len(table)} lignes écrites dans {args.sortie}")
+        else:
+            print(table.to_string(index=False))
+
+if __name__ == '__main__':
+    main()